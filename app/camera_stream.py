@@ -0,0 +1,177 @@
+import sys
+import threading
+import time
+from collections import deque
+import cv2
+
+from emotion_analyzer import analyze_faces, to_gray, load_models
+from face_detector import FaceDetector
+
+# Saniyedeki analiz sayısı, yumuşatma penceresi (analiz sayısı) ve alarm eşiği
+ANALYSIS_RATE = 2.0
+SMOOTHING_WINDOW = 5
+HAZARD_THRESHOLD = 60
+# Alarm için eşiğin üstünde kalması gereken ardışık analiz sayısı
+SUSTAIN_COUNT = 3
+
+
+class HazardStream:
+    """Kamerayı (ya da video dosyasını) açık tutup kareleri bellekte sürekli analiz eder.
+
+    Yakalama ve analiz ayrı iş parçacıklarında çalışır; analiz yetişemezse yalnızca en
+    son kare işlenir, aradakiler atılır. Tehlike skoru kayan pencerede ortalanır ve
+    on_alarm yalnızca ortalama eşiği sustain kez üst üste aştığında bir kez çağrılır.
+    Geri çağrılar analiz iş parçacığında yapılır.
+    """
+
+    def __init__(self, source=0, rate=ANALYSIS_RATE, window=SMOOTHING_WINDOW,
+                 threshold=HAZARD_THRESHOLD, sustain=SUSTAIN_COUNT,
+                 on_result=None, on_alarm=None, analyze=None, detector_backend="haar"):
+        self.source = source
+        self.detector_backend = detector_backend
+        self.detector = None
+        self.rate = rate
+        self.threshold = threshold
+        self.sustain = sustain
+        self.on_result = on_result
+        self.on_alarm = on_alarm
+        self.analyze = analyze or self._analyze_frame
+        self.scores = deque(maxlen=window)
+        self.frames_read = 0
+        self.frames_analyzed = 0
+        self._above = 0
+        self._alarmed = False
+        self._frame = None
+        self._frame_lock = threading.Lock()
+        self._new_frame = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _prepare(self):
+        """Varsayılan analiz için model ve yüz algılayıcısını hazırla; model yoksa False"""
+        if self.analyze != self._analyze_frame:
+            return True
+        face_cascade, emotion_model = load_models()
+        if face_cascade is None or emotion_model is None:
+            print("❌ Model dosyaları yüklenemedi, canlı analiz başlatılmadı")
+            return False
+        if self.detector is None:
+            self.detector = FaceDetector(face_cascade, backend=self.detector_backend)
+        return True
+
+    def _analyze_frame(self, frame):
+        # Ardışık karelerde yüz, son bulunduğu yerin çevresinde aranır
+        _, hazard = analyze_faces(to_gray(frame), detector=self.detector, track=True)
+        return hazard
+
+    @property
+    def smoothed(self):
+        return sum(self.scores) / len(self.scores) if self.scores else None
+
+    def start(self):
+        if not self._prepare():
+            return False
+        cam = cv2.VideoCapture(self.source)
+        if not cam.isOpened():
+            print(f"❌ Kamera açılamadı: {self.source}")
+            return False
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, args=(cam,), daemon=True),
+            threading.Thread(target=self._analysis_loop, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        print(f"📸 Canlı analiz başladı: {self.source}")
+        return True
+
+    def stop(self):
+        self._stop.set()
+        self._new_frame.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        self._threads = []
+
+    def wait(self):
+        """Kaynak bitene ya da stop çağrılana kadar bekle"""
+        for thread in self._threads:
+            thread.join()
+
+    def _capture_loop(self, cam):
+        # Video dosyası kendi hızında okunur, kamera zaten gerçek zamanlıdır
+        fps = cam.get(cv2.CAP_PROP_FPS) if isinstance(self.source, str) else 0
+        frame_interval = 1.0 / fps if fps and fps > 0 else 0
+        next_frame_at = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                ret, frame = cam.read()
+                if not ret or frame is None:
+                    break
+                with self._frame_lock:
+                    # Analiz edilmemiş eski kare varsa üzerine yazılır (kare atlama)
+                    self._frame = frame
+                    self.frames_read += 1
+                self._new_frame.set()
+                if frame_interval:
+                    next_frame_at += frame_interval
+                    delay = next_frame_at - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+        finally:
+            cam.release()
+            self._stop.set()
+            self._new_frame.set()
+
+    def _analysis_loop(self):
+        interval = 1.0 / self.rate
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self._new_frame.wait()
+            self._new_frame.clear()
+            with self._frame_lock:
+                frame, self._frame = self._frame, None
+            if frame is None:
+                continue
+            try:
+                hazard = self.analyze(frame)
+            except Exception as e:
+                # Tek karedeki hata akışı durdurmaz, sonraki kare denenir
+                print(f"⚠️ Kare analiz edilemedi: {e}")
+                hazard = None
+            self.frames_analyzed += 1
+            if hazard is not None:
+                self._add_score(hazard)
+            self._stop.wait(max(interval - (time.monotonic() - started), 0))
+
+    def _add_score(self, hazard):
+        self.scores.append(hazard)
+        smoothed = self.smoothed
+        if self.on_result:
+            self.on_result(hazard, smoothed)
+
+        if smoothed >= self.threshold:
+            self._above += 1
+            if self._above >= self.sustain and not self._alarmed:
+                self._alarmed = True
+                if self.on_alarm:
+                    self.on_alarm(smoothed)
+        else:
+            # Ortalama eşiğin altına inince alarm yeniden kurulur
+            self._above = 0
+            self._alarmed = False
+
+
+if __name__ == "__main__":
+    # Video dosyasıyla deneme: python camera_stream.py <video|kamera_no> [analiz/sn]
+    source = sys.argv[1] if len(sys.argv) > 1 else "0"
+    source = int(source) if source.isdigit() else source
+    stream = HazardStream(
+        source,
+        rate=float(sys.argv[2]) if len(sys.argv) > 2 else ANALYSIS_RATE,
+        on_result=lambda hazard, smoothed: print(f"→ Hazard %{hazard}, ortalama %{smoothed:.1f}"),
+        on_alarm=lambda smoothed: print(f"🚨 Süreklilik gösteren tehlike: %{smoothed:.1f}"),
+    )
+    if stream.start():
+        stream.wait()
+        print(f"Okunan kare: {stream.frames_read}, analiz edilen: {stream.frames_analyzed}")
@@ -1,14 +1,103 @@
+import sys
+import math
 import sqlite3
+import threading
+import numpy as np
+
+# Tüm uygulamanın paylaştığı veritabanı dosyası
+DB_PATH = "users.db"
+
+# Konum yorumlarının varsayılan sayfa boyutu
+REVIEW_PAGE_SIZE = 10
+
+# Toplu içe/dışa aktarmada bir seferde işlenen satır sayısı
+TRANSFER_CHUNK = 50000
+# Artımlı güncellemede taranacak en fazla yeni satır ve uygulanacak en fazla değişen hücre;
+# fazlası için alan baştan yüklenir
+MAX_CHANGED_ROWS = 10000
+MAX_CHANGED_CELLS = 256
+
+# Bağlantılar iş parçacığı başına bir kez açılır ve yeniden kullanılır
+_local = threading.local()
+
+
+def get_connection(db_path=DB_PATH):
+    """Bu iş parçacığına ait, ayarları yapılmış ve yeniden kullanılan bağlantıyı döndür.
+
+    sqlite3 hazırlanmış ifadeleri bağlantı başına önbelleğe aldığından aynı SQL metni
+    tekrar derlenmez.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=5, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-8000")
+        connections[db_path] = conn
+    return conn
+
+
+def close_connection(db_path=DB_PATH):
+    """Bu iş parçacığının bağlantısını kapat"""
+    connections = getattr(_local, "connections", {})
+    conn = connections.pop(db_path, None)
+    if conn is not None:
+        conn.close()
+
+# Konum ızgarası hücre boyutu (derece, ~11 m); aynı hücredeki puanlar tek konum sayılır
+CELL_SIZE = 0.0001
+# Alan sorgularında hücreler yaklaşık bu kadar piksellik gruplar halinde özetlenir
+GROUP_PX = 8
+
+
+def location_cell(lat, lon):
+    """Koordinatı tamsayı ızgara hücresine çevir"""
+    return (math.floor(lat / CELL_SIZE + 0.5), math.floor(lon / CELL_SIZE + 0.5))
+
+
+def cell_center(cell_lat, cell_lon):
+    """Hücrenin temsil ettiği koordinat"""
+    return (cell_lat * CELL_SIZE, cell_lon * CELL_SIZE)
+
+
+def group_factor(zoom):
+    """Yakınlaştırma seviyesine göre kaç hücrenin (2'nin kuvveti) tek grupta özetleneceği"""
+    degrees_per_px = 360.0 / (256 * 2 ** zoom)
+    ratio = degrees_per_px * GROUP_PX / CELL_SIZE
+    if ratio < 2:
+        return 1
+    return 2 ** int(math.log2(ratio))
+
+
+# Grup özeti: (lat, lon, ortalama puan, puan sayısı, konum sayısı)
+GROUP_COLUMNS = """
+    CASE WHEN COUNT(*) = 1 THEN MIN(a.lat)
+         ELSE SUM(a.lat * a.rating_count) / SUM(a.rating_count) END,
+    CASE WHEN COUNT(*) = 1 THEN MIN(a.lon)
+         ELSE SUM(a.lon * a.rating_count) / SUM(a.rating_count) END,
+    SUM(a.score_sum) * 1.0 / SUM(a.rating_count),
+    SUM(a.rating_count),
+    COUNT(*)
+"""
+
+
+def group_key(cell_lat, cell_lon, factor):
+    """Hücrenin factor x factor'lük gruptaki köşe hücresi (get_scores_in_bbox gruplamasıyla aynı)"""
+    return (cell_lat - cell_lat % factor, cell_lon - cell_lon % factor)
+
 
 class Database:
-    def __init__(self):
+    def __init__(self, db_path=DB_PATH):
         """Veritabanı bağlantısını kur ve tabloyu oluştur."""
         # Aynı users.db dosyasını kullan
-        self.conn = sqlite3.connect("users.db")
-        self.cursor = self.conn.cursor()
-        
+        self.db_path = db_path
+
         # Security scores tablosunu users.db içinde oluştur
-        self.cursor.execute("""
+        self.conn.execute("""
             CREATE TABLE IF NOT EXISTS security_scores (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id INTEGER,
@@ -19,58 +108,515 @@ class Database:
                 FOREIGN KEY (user_id) REFERENCES users (id)
             )
         """)
+
+        self._migrate_score_cells()
+
+        # Konum (hücre) başına özet tablo: okuma sorguları ham satırları taramaz
+        cur = self.conn.execute("PRAGMA table_info(location_scores)")
+        columns = [row[1] for row in cur.fetchall()]
+        rebuild = "cell_lat" not in columns
+        if columns and rebuild:
+            # Eski (lat, lon) anahtarlı özet tablo türetilmiş veridir, yeniden oluşturulur
+            self.conn.execute("DROP TABLE location_scores")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS location_scores (
+                id INTEGER PRIMARY KEY,
+                cell_lat INTEGER NOT NULL,
+                cell_lon INTEGER NOT NULL,
+                lat REAL,
+                lon REAL,
+                rating_count INTEGER NOT NULL,
+                score_sum INTEGER NOT NULL,
+                min_score INTEGER,
+                max_score INTEGER,
+                last_rated_at TIMESTAMP,
+                UNIQUE (cell_lat, cell_lon)
+            )
+        """)
+
+        # Alan sorguları için R*Tree; SQLite rtree modülü yoksa hücre indeksi kullanılır
+        try:
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS location_scores_rtree
+                USING rtree(id, min_lat, max_lat, min_lon, max_lon)
+            """)
+            self.has_rtree = True
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ R*Tree kullanılamıyor, hücre indeksi kullanılacak: {e}")
+            self.has_rtree = False
         self.conn.commit()
 
+        if rebuild:
+            self.rebuild_aggregates()
+
+    def _migrate_score_cells(self):
+        """Eski satırlara hücre sütunlarını ekle ve doldur"""
+        cur = self.conn.execute("PRAGMA table_info(security_scores)")
+        columns = [row[1] for row in cur.fetchall()]
+        with self.conn:
+            if "cell_lat" not in columns:
+                self.conn.execute("ALTER TABLE security_scores ADD COLUMN cell_lat INTEGER")
+                self.conn.execute("ALTER TABLE security_scores ADD COLUMN cell_lon INTEGER")
+            cur = self.conn.execute("SELECT id, lat, lon FROM security_scores WHERE cell_lat IS NULL")
+            rows = cur.fetchall()
+            if rows:
+                self.conn.executemany(
+                    "UPDATE security_scores SET cell_lat = ?, cell_lon = ? WHERE id = ?",
+                    [(*location_cell(lat, lon), row_id) for row_id, lat, lon in rows]
+                )
+                print(f"✅ {len(rows)} puan kaydı ızgara hücrelerine taşındı")
+            # Hücre sorgularını ve en yeni yorumların sıralı okunmasını aynı indeks karşılar
+            self.conn.execute("DROP INDEX IF EXISTS idx_security_scores_cell")
+            self.conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_security_scores_cell_recent
+                ON security_scores (cell_lat, cell_lon, created_at, id)
+            """)
+
     def save_score(self, user_id, lat, lon, score):
-        """Kullanıcının verdiği güvenlik puanını kaydet."""
-        self.cursor.execute("""
-            INSERT INTO security_scores (user_id, lat, lon, score) 
-            VALUES (?, ?, ?, ?)
-        """, (user_id, lat, lon, score))
-        self.conn.commit()
+        """Kullanıcının verdiği güvenlik puanını kaydet (özet tablo aynı işlemde güncellenir).
+
+        Puanın ait olduğu hücrenin merkez koordinatını döndürür.
+        """
+        self.save_scores([(user_id, lat, lon, score)])
         print(f"✅ Puan kaydedildi: User {user_id}, Score {score}")
+        return cell_center(*location_cell(lat, lon))
+
+    def save_scores(self, rows):
+        """(user_id, lat, lon, score) satırlarını tek işlemde kaydet.
+
+        Özet tablo her hücre için bir kez güncellenir. Kaydedilen satır sayısını döndürür.
+        """
+        records = []
+        cells = {}
+        for user_id, lat, lon, score in rows:
+            cell = location_cell(lat, lon)
+            records.append((user_id, lat, lon, cell[0], cell[1], score))
+            agg = cells.get(cell)
+            if agg is None:
+                cells[cell] = [1, score, score, score]
+            else:
+                agg[0] += 1
+                agg[1] += score
+                agg[2] = min(agg[2], score)
+                agg[3] = max(agg[3], score)
+        if not records:
+            return 0
+
+        conn = self.conn
+        with conn:
+            conn.executemany("""
+                INSERT INTO security_scores (user_id, lat, lon, cell_lat, cell_lon, score)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, records)
+            for (cell_lat, cell_lon), (count, total, low, high) in cells.items():
+                cur = conn.execute("""
+                    UPDATE location_scores
+                    SET rating_count = rating_count + ?,
+                        score_sum = score_sum + ?,
+                        min_score = MIN(min_score, ?),
+                        max_score = MAX(max_score, ?),
+                        last_rated_at = CURRENT_TIMESTAMP
+                    WHERE cell_lat = ? AND cell_lon = ?
+                """, (count, total, low, high, cell_lat, cell_lon))
+                if cur.rowcount == 0:
+                    center_lat, center_lon = cell_center(cell_lat, cell_lon)
+                    cur = conn.execute("""
+                        INSERT INTO location_scores
+                            (cell_lat, cell_lon, lat, lon, rating_count, score_sum,
+                             min_score, max_score, last_rated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    """, (cell_lat, cell_lon, center_lat, center_lon, count, total, low, high))
+                    if self.has_rtree:
+                        conn.execute("""
+                            INSERT INTO location_scores_rtree (id, min_lat, max_lat, min_lon, max_lon)
+                            VALUES (?, ?, ?, ?, ?)
+                        """, (cur.lastrowid, center_lat, center_lat, center_lon, center_lon))
+        return len(records)
+
+    def checkpoint(self):
+        """WAL içeriğini ana dosyaya yaz ve diske eşitle (uygulama duraklarken)"""
+        self.conn.execute("PRAGMA wal_checkpoint(FULL)").fetchall()
+
+    def rebuild_aggregates(self):
+        """Özet tabloyu ham puanlardan yeniden oluştur; tutarsız konum sayısını döndürür."""
+        with self.conn:
+            self.conn.execute("DROP TABLE IF EXISTS temp.location_scores_rebuilt")
+            self.conn.execute("""
+                CREATE TEMP TABLE location_scores_rebuilt AS
+                SELECT cell_lat, cell_lon, cell_lat * ? AS lat, cell_lon * ? AS lon,
+                       COUNT(*) AS rating_count, SUM(score) AS score_sum,
+                       MIN(score) AS min_score, MAX(score) AS max_score,
+                       MAX(created_at) AS last_rated_at
+                FROM security_scores
+                GROUP BY cell_lat, cell_lon
+            """, (CELL_SIZE, CELL_SIZE))
+            # Sayı, toplam, en düşük ya da en yüksek puanı farklı olan (veya eksik/fazla) konumlar
+            cur = self.conn.execute("""
+                SELECT COUNT(*) FROM (
+                    SELECT cell_lat, cell_lon FROM (
+                        SELECT cell_lat, cell_lon, rating_count, score_sum, min_score, max_score FROM location_scores
+                        EXCEPT
+                        SELECT cell_lat, cell_lon, rating_count, score_sum, min_score, max_score FROM location_scores_rebuilt
+                    )
+                    UNION
+                    SELECT cell_lat, cell_lon FROM (
+                        SELECT cell_lat, cell_lon, rating_count, score_sum, min_score, max_score FROM location_scores_rebuilt
+                        EXCEPT
+                        SELECT cell_lat, cell_lon, rating_count, score_sum, min_score, max_score FROM location_scores
+                    )
+                )
+            """)
+            mismatched = cur.fetchone()[0]
+            self.conn.execute("DELETE FROM location_scores")
+            self.conn.execute("""
+                INSERT INTO location_scores
+                    (cell_lat, cell_lon, lat, lon, rating_count, score_sum,
+                     min_score, max_score, last_rated_at)
+                SELECT cell_lat, cell_lon, lat, lon, rating_count, score_sum,
+                       min_score, max_score, last_rated_at
+                FROM location_scores_rebuilt
+            """)
+            self.conn.execute("DROP TABLE location_scores_rebuilt")
+            if self.has_rtree:
+                self.conn.execute("DELETE FROM location_scores_rtree")
+                self.conn.execute("""
+                    INSERT INTO location_scores_rtree (id, min_lat, max_lat, min_lon, max_lon)
+                    SELECT id, lat, lat, lon, lon FROM location_scores
+                """)
+        return mismatched
+
+    def export_scores(self, path, chunk_size=TRANSFER_CHUNK):
+        """Tüm puanları sütun dizileri halinde sıkıştırılmış .npz dosyasına yaz.
+
+        Sütunlar: user_id (yoksa -1), lat, lon, score, created_at (Unix saniyesi).
+        Yazılan satır sayısını döndürür.
+        """
+        cur = self.conn.execute("""
+            SELECT COALESCE(user_id, -1), lat, lon, score, CAST(strftime('%s', created_at) AS INTEGER)
+            FROM security_scores
+            ORDER BY id
+        """)
+        chunks = []
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.float64))
+        table = np.concatenate(chunks) if chunks else np.empty((0, 5))
+        np.savez_compressed(
+            path,
+            user_id=table[:, 0].astype(np.int64),
+            lat=table[:, 1],
+            lon=table[:, 2],
+            score=table[:, 3].astype(np.int8),
+            created_at=table[:, 4].astype(np.int64),
+        )
+        return len(table)
+
+    def import_scores(self, path, chunk_size=TRANSFER_CHUNK):
+        """export_scores ile yazılmış dosyadaki puanları ekle.
+
+        Aynı kullanıcının aynı konuma aynı anda verdiği puan (dosyada ya da tabloda)
+        bir kez eklenir. Özet tablo en sonda, yeni puanların hücre özetleriyle tek
+        seferde güncellenir. Eklenen satır sayısını döndürür.
+        """
+        with np.load(path) as data:
+            columns = [data["user_id"], data["lat"], data["lon"], data["score"], data["created_at"]]
+        # location_cell ile aynı yuvarlama, tüm dizi için tek seferde
+        cell_lats = np.floor(columns[1] / CELL_SIZE + 0.5).astype(np.int64)
+        cell_lons = np.floor(columns[2] / CELL_SIZE + 0.5).astype(np.int64)
+
+        conn = self.conn
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS temp.score_import")
+            conn.execute("""
+                CREATE TEMP TABLE score_import (
+                    user_id INTEGER, lat REAL, lon REAL, cell_lat INTEGER, cell_lon INTEGER,
+                    score INTEGER, created_at INTEGER
+                )
+            """)
+            for start in range(0, len(columns[0]), chunk_size):
+                part = slice(start, start + chunk_size)
+                conn.executemany(
+                    "INSERT INTO score_import VALUES (NULLIF(?, -1), ?, ?, ?, ?, ?, ?)",
+                    zip(columns[0][part].tolist(), columns[1][part].tolist(), columns[2][part].tolist(),
+                        cell_lats[part].tolist(), cell_lons[part].tolist(),
+                        columns[3][part].tolist(), columns[4][part].tolist())
+                )
+            last_score_id = self.get_max_score_id()
+            conn.execute("""
+                INSERT INTO security_scores (user_id, lat, lon, cell_lat, cell_lon, score, created_at)
+                SELECT user_id, MIN(lat), MIN(lon), cell_lat, cell_lon, score,
+                       datetime(created_at, 'unixepoch')
+                FROM score_import i
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM security_scores s
+                    WHERE s.cell_lat = i.cell_lat AND s.cell_lon = i.cell_lon
+                      AND s.user_id IS i.user_id AND s.score = i.score
+                      AND s.created_at = datetime(i.created_at, 'unixepoch')
+                )
+                GROUP BY user_id, cell_lat, cell_lon, score, created_at
+                ORDER BY created_at
+            """)
+            conn.execute("DROP TABLE score_import")
+            inserted = self._apply_scores_after(last_score_id)
+        return inserted
+
+    def _apply_scores_after(self, last_score_id):
+        """id'si last_score_id'den büyük puanları özet tabloya tek seferde işle; puan sayısını döndürür"""
+        conn = self.conn
+        conn.execute("DROP TABLE IF EXISTS temp.score_import_agg")
+        conn.execute("""
+            CREATE TEMP TABLE score_import_agg AS
+            SELECT cell_lat, cell_lon, COUNT(*) AS rating_count, SUM(score) AS score_sum,
+                   MIN(score) AS min_score, MAX(score) AS max_score, MAX(created_at) AS last_rated_at
+            FROM security_scores
+            WHERE id > ?
+            GROUP BY cell_lat, cell_lon
+        """, (last_score_id,))
+        conn.execute("CREATE UNIQUE INDEX temp.idx_score_import_agg ON score_import_agg (cell_lat, cell_lon)")
+        last_location_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM location_scores").fetchone()[0]
+        conn.execute("""
+            UPDATE location_scores
+            SET (rating_count, score_sum, min_score, max_score, last_rated_at) = (
+                SELECT location_scores.rating_count + n.rating_count,
+                       location_scores.score_sum + n.score_sum,
+                       MIN(location_scores.min_score, n.min_score),
+                       MAX(location_scores.max_score, n.max_score),
+                       MAX(location_scores.last_rated_at, n.last_rated_at)
+                FROM score_import_agg n
+                WHERE n.cell_lat = location_scores.cell_lat AND n.cell_lon = location_scores.cell_lon
+            )
+            WHERE EXISTS (
+                SELECT 1 FROM score_import_agg n
+                WHERE n.cell_lat = location_scores.cell_lat AND n.cell_lon = location_scores.cell_lon
+            )
+        """)
+        conn.execute("""
+            INSERT INTO location_scores
+                (cell_lat, cell_lon, lat, lon, rating_count, score_sum,
+                 min_score, max_score, last_rated_at)
+            SELECT n.cell_lat, n.cell_lon, n.cell_lat * ?, n.cell_lon * ?, n.rating_count, n.score_sum,
+                   n.min_score, n.max_score, n.last_rated_at
+            FROM score_import_agg n
+            WHERE NOT EXISTS (
+                SELECT 1 FROM location_scores a
+                WHERE a.cell_lat = n.cell_lat AND a.cell_lon = n.cell_lon
+            )
+        """, (CELL_SIZE, CELL_SIZE))
+        if self.has_rtree:
+            conn.execute("""
+                INSERT INTO location_scores_rtree (id, min_lat, max_lat, min_lon, max_lon)
+                SELECT id, lat, lat, lon, lon FROM location_scores WHERE id > ?
+            """, (last_location_id,))
+        inserted = conn.execute("SELECT COALESCE(SUM(rating_count), 0) FROM score_import_agg").fetchone()[0]
+        conn.execute("DROP TABLE score_import_agg")
+        return inserted
 
     def get_scores(self):
         """Tüm konumların ortalama puanlarını getir."""
-        self.cursor.execute("""
-            SELECT lat, lon, AVG(score) 
-            FROM security_scores 
-            GROUP BY lat, lon
+        cur = self.conn.execute("""
+            SELECT lat, lon, score_sum * 1.0 / rating_count
+            FROM location_scores
         """)
-        return self.cursor.fetchall()
+        return cur.fetchall()
+
+    def get_max_score_id(self):
+        """En son kaydedilen puanın id'si (değişiklik takibi için)."""
+        cur = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM security_scores")
+        return cur.fetchone()[0]
+
+    def get_scores_in_bbox(self, lat_min, lat_max, lon_min, lon_max, zoom):
+        """Alandaki konumları yakınlaştırma seviyesine uygun gruplar halinde getir.
+
+        Her satır: (lat, lon, ortalama puan, puan sayısı, konum sayısı). Tek konumlu
+        gruplar konumun kendi koordinatını döndürür.
+        """
+        factor = group_factor(zoom)
+        if self.has_rtree:
+            source = """
+                location_scores a
+                JOIN location_scores_rtree r ON r.id = a.id
+                WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?
+            """
+            params = (lat_min, lat_max, lon_min, lon_max)
+        else:
+            cell_lat_min, cell_lon_min = location_cell(lat_min, lon_min)
+            cell_lat_max, cell_lon_max = location_cell(lat_max, lon_max)
+            source = """
+                location_scores a
+                WHERE a.cell_lat BETWEEN ? AND ? AND a.cell_lon BETWEEN ? AND ?
+            """
+            params = (cell_lat_min, cell_lat_max, cell_lon_min, cell_lon_max)
+
+        # Negatif hücrelerde de doğru çalışan tabana yuvarlanmış grup anahtarı
+        cur = self.conn.execute(f"""
+            SELECT {GROUP_COLUMNS}
+            FROM {source}
+            GROUP BY a.cell_lat - ((a.cell_lat % ?) + ?) % ?,
+                     a.cell_lon - ((a.cell_lon % ?) + ?) % ?
+        """, params + (factor,) * 6)
+        return cur.fetchall()
+
+    def get_changed_cells(self, last_id, lat_min, lat_max, lon_min, lon_max,
+                          limit=MAX_CHANGED_CELLS, max_rows=MAX_CHANGED_ROWS):
+        """Alanda, id'si last_id'den büyük puanların düştüğü hücreleri ve yeni en büyük id'yi getir.
+
+        Yalnızca last_id'den sonraki satırlar taranır. Yeni satır sayısı max_rows'u ya da
+        değişen hücre sayısı limit'i aşarsa hücreler yerine None döndürülür (alan baştan
+        yüklenmeli).
+        """
+        max_id = self.get_max_score_id()
+        if max_id <= last_id:
+            return set(), last_id
+        if max_id - last_id > max_rows:
+            return None, max_id
+        cell_lat_min, cell_lon_min = location_cell(lat_min, lon_min)
+        cell_lat_max, cell_lon_max = location_cell(lat_max, lon_max)
+        cur = self.conn.execute("""
+            SELECT DISTINCT cell_lat, cell_lon FROM security_scores
+            WHERE id > ? AND id <= ?
+              AND cell_lat BETWEEN ? AND ? AND cell_lon BETWEEN ? AND ?
+            LIMIT ?
+        """, (last_id, max_id, cell_lat_min, cell_lat_max, cell_lon_min, cell_lon_max, limit + 1))
+        cells = set(cur.fetchall())
+        return (None if len(cells) > limit else cells), max_id
+
+    def get_score_groups(self, groups, zoom):
+        """Verilen grupların (group_key) güncel özetlerini get_scores_in_bbox biçiminde getir.
+
+        {grup anahtarı: (lat, lon, ortalama puan, puan sayısı, konum sayısı)} döndürür;
+        konumu olmayan gruplar sonuçta yer almaz.
+        """
+        factor = group_factor(zoom)
+        result = {}
+        for cell_lat, cell_lon in groups:
+            row = self.conn.execute(f"""
+                SELECT {GROUP_COLUMNS}
+                FROM location_scores a
+                WHERE a.cell_lat BETWEEN ? AND ? AND a.cell_lon BETWEEN ? AND ?
+            """, (cell_lat, cell_lat + factor - 1, cell_lon, cell_lon + factor - 1)).fetchone()
+            if row[4]:
+                result[(cell_lat, cell_lon)] = row
+        return result
 
     def get_user_scores(self, user_id):
         """Belirli bir kullanıcının verdiği puanları getir."""
-        self.cursor.execute("""
-            SELECT lat, lon, score, created_at 
-            FROM security_scores 
-            WHERE user_id = ? 
+        cur = self.conn.execute("""
+            SELECT lat, lon, score, created_at
+            FROM security_scores
+            WHERE user_id = ?
             ORDER BY created_at DESC
         """, (user_id,))
-        return self.cursor.fetchall()
+        return cur.fetchall()
+
+    def get_location_reviews(self, lat, lon, limit=REVIEW_PAGE_SIZE, before=None):
+        """Bu konuma verilen puanları en yeniden eskiye sayfa sayfa getir.
+
+        Her satır: (kullanıcı id, puan, tarih, puan id). Sonraki sayfa için son satırın
+        (tarih, puan id) değeri before olarak verilir.
+        """
+        cell_lat, cell_lon = location_cell(lat, lon)
+        if before is None:
+            keyset, params = "", (cell_lat, cell_lon, limit)
+        else:
+            keyset, params = "AND (s.created_at, s.id) < (?, ?)", (cell_lat, cell_lon, *before, limit)
+        cur = self.conn.execute(f"""
+            SELECT u.id, s.score, s.created_at, s.id
+            FROM security_scores s
+            JOIN users u ON s.user_id = u.id
+            WHERE s.cell_lat = ? AND s.cell_lon = ? {keyset}
+            ORDER BY s.created_at DESC, s.id DESC
+            LIMIT ?
+        """, params)
+        return cur.fetchall()
+
+    def get_location_summary(self, lat, lon, limit=3):
+        """Konum özeti ve en yeni limit yorum tek sorguda.
+
+        (get_location_details ile aynı özet, get_location_reviews satırları) döndürür.
+        """
+        cell = location_cell(lat, lon)
+        cur = self.conn.execute("""
+            SELECT a.rating_count, a.score_sum * 1.0 / a.rating_count, a.min_score, a.max_score,
+                   r.user_id, r.score, r.created_at, r.id
+            FROM location_scores a
+            LEFT JOIN (
+                SELECT u.id AS user_id, s.score, s.created_at, s.id
+                FROM security_scores s
+                JOIN users u ON s.user_id = u.id
+                WHERE s.cell_lat = ? AND s.cell_lon = ?
+                ORDER BY s.created_at DESC, s.id DESC
+                LIMIT ?
+            ) r ON 1
+            WHERE a.cell_lat = ? AND a.cell_lon = ?
+            ORDER BY r.created_at DESC, r.id DESC
+        """, (*cell, limit, *cell))
+        rows = cur.fetchall()
+        if not rows:
+            return (0, None, None, None), []
+        reviews = [row[4:] for row in rows if row[7] is not None]
+        return rows[0][:4], reviews
 
     def get_average_score(self, lat, lon):
         """Belirli bir konumun ortalama puanını döndürür."""
-        self.cursor.execute("""
-            SELECT AVG(score) 
-            FROM security_scores 
-            WHERE lat=? AND lon=?
-        """, (lat, lon))
-        result = self.cursor.fetchone()
+        cur = self.conn.execute("""
+            SELECT score_sum * 1.0 / rating_count
+            FROM location_scores
+            WHERE cell_lat=? AND cell_lon=?
+        """, location_cell(lat, lon))
+        result = cur.fetchone()
         if result and result[0] is not None:
             return float(result[0])
         return 0
 
     def get_location_details(self, lat, lon):
         """Konum detayları: toplam puan sayısı, ortalama vs."""
-        self.cursor.execute("""
-            SELECT COUNT(*) as total_ratings, AVG(score) as avg_score, 
-                   MIN(score) as min_score, MAX(score) as max_score
-            FROM security_scores 
-            WHERE lat=? AND lon=?
-        """, (lat, lon))
-        return self.cursor.fetchone()
-    
+        cur = self.conn.execute("""
+            SELECT rating_count, score_sum * 1.0 / rating_count, min_score, max_score
+            FROM location_scores
+            WHERE cell_lat=? AND cell_lon=?
+        """, location_cell(lat, lon))
+        return cur.fetchone() or (0, None, None, None)
+
+    def get_location_aggregate(self, lat, lon):
+        """Hücrenin ham özeti: (puan sayısı, puan toplamı, en düşük, en yüksek) ya da None"""
+        cur = self.conn.execute("""
+            SELECT rating_count, score_sum, min_score, max_score
+            FROM location_scores
+            WHERE cell_lat=? AND cell_lon=?
+        """, location_cell(lat, lon))
+        return cur.fetchone()
+
+    @property
+    def conn(self):
+        """Çağıran iş parçacığının paylaşılan bağlantısı"""
+        return get_connection(self.db_path)
+
     def close(self):
         """Veritabanı bağlantısını kapat"""
-        self.conn.close()
+        close_connection(self.db_path)
+
+
+if __name__ == "__main__":
+    # Kullanım: python database.py rebuild-aggregates
+    #           python database.py export-scores <dosya.npz>
+    #           python database.py import-scores <dosya.npz>
+    args = sys.argv[1:]
+    if args == ["rebuild-aggregates"]:
+        db = Database()
+        mismatched = db.rebuild_aggregates()
+        print(f"Özet tablo yeniden oluşturuldu, tutarsız konum sayısı: {mismatched}")
+        db.close()
+    elif len(args) == 2 and args[0] == "export-scores":
+        db = Database()
+        count = db.export_scores(args[1])
+        print(f"✅ {count} puan dışa aktarıldı: {args[1]}")
+        db.close()
+    elif len(args) == 2 and args[0] == "import-scores":
+        db = Database()
+        count = db.import_scores(args[1])
+        print(f"✅ {count} yeni puan içe aktarıldı: {args[1]}")
+        db.close()
+    else:
+        print("Kullanım: python database.py rebuild-aggregates | export-scores <dosya.npz> | import-scores <dosya.npz>")
@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+import cv2
+import numpy as np
+
+from face_detector import FaceDetector
+
+# 📍 Dosya yolları
+BASE_DIR     = os.path.dirname(__file__)
+MODEL_PATH   = os.path.join(BASE_DIR, 'models', 'emotion_model.h5')
+CASCADE_PATH = os.path.join(BASE_DIR, 'data', 'haarcascade_frontalface_default.xml')
+
+# 😶‍🌫️ Duygu etiketleri (modelinize göre ayarlayın)
+EMOTIONS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+# Model ve cascade ilk ihtiyaçta bir kez yüklenir
+_load_lock = threading.Lock()
+_models = None
+
+
+def load_models():
+    """Cascade ve duygu modelini (gerekirse) yükleyip (face_cascade, emotion_model) döndür.
+
+    Birden fazla iş parçacığı aynı anda çağırırsa yükleme yalnızca bir kez yapılır.
+    Hata olursa (None, None) döndürülür ve tekrar denenmez.
+    """
+    global _models
+    if _models is not None:
+        return _models
+    with _load_lock:
+        if _models is None:
+            start = time.perf_counter()
+            try:
+                # TensorFlow içe aktarımı pahalı, bu yüzden burada yapılır
+                from tensorflow.keras.models import load_model
+                face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
+                emotion_model = load_model(MODEL_PATH, compile=False)
+                _models = (face_cascade, emotion_model)
+                print(f"✅ Model ve cascade dosyaları yüklendi ({time.perf_counter() - start:.2f} s)")
+            except Exception as e:
+                print(f"❌ Model yükleme hatası: {e}")
+                _models = (None, None)
+    return _models
+
+
+def models_ready():
+    """Yükleme denendi ve model kullanılabilir mi?"""
+    return _models is not None and _models[1] is not None
+
+
+def warm_up_async(callback=None):
+    """Modeli arka planda yükle; bitince callback(hazır_mı) yükleyen iş parçacığında çağrılır"""
+    def worker():
+        load_models()
+        if callback:
+            callback(models_ready())
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
+
+
+def face_batch(gray, faces, size=64):
+    """Tespit edilen tüm yüzleri kırpıp (N, size, size, 1) float32 modele giriş dizisine çevir"""
+    batch = np.empty((len(faces), size, size, 1), dtype=np.float32)
+    for i, (x, y, w, h) in enumerate(faces):
+        batch[i, :, :, 0] = cv2.resize(gray[y:y + h, x:x + w], (size, size))
+    batch /= 255.0
+    return batch
+
+
+def predict_batch(model, batch):
+    """Tüm yüzleri tek çağrıda çalıştır; Keras modeli ya da TFLite arka ucu olabilir"""
+    if hasattr(model, "run"):
+        return np.asarray(model.run(batch))
+    # predict() her çağrıda veri hattı kurar, tek grup için predict_on_batch daha hafif
+    return np.asarray(model.predict_on_batch(batch))
+
+
+def hazards_from_predictions(preds):
+    """Korku + üzüntü olasılıklarından yüz başına tehlike yüzdesi"""
+    return ((preds[:, EMOTIONS.index("fear")] + preds[:, EMOTIONS.index("sad")]) * 100).astype(int)
+
+
+def analyze_faces(gray, model=None, detector=None, track=False):
+    """Gri görüntüdeki tüm yüzleri tek grup halinde analiz et.
+
+    Ardışık karelerde aynı detector ile track=True verilirse yalnızca son yüzlerin
+    çevresi taranır. [(x, y, w, h, tehlike)] listesi ve en yüksek tehlikeyi döndürür;
+    yüz yoksa ([], None).
+    """
+    if model is None or detector is None:
+        loaded_cascade, loaded_model = load_models()
+        if model is None:
+            model = loaded_model
+        if detector is None:
+            detector = FaceDetector(loaded_cascade)
+    faces = detector.detect(gray, track=track)
+    if len(faces) == 0:
+        return [], None
+
+    hazards = hazards_from_predictions(predict_batch(model, face_batch(gray, faces)))
+    results = [(int(x), int(y), int(w), int(h), int(hazard)) for (x, y, w, h), hazard in zip(faces, hazards)]
+    # Grubun tehlikesi en riskli görünen kişiye göre belirlenir
+    return results, int(hazards.max())
+
+
+def to_gray(frame):
+    """BGR, BGRA ya da zaten gri kareyi gri görüntüye çevir (gri kare kopyalanmaz)"""
+    if frame.ndim == 2:
+        return frame
+    if frame.shape[2] == 1:
+        return frame[:, :, 0]
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+def save_frame_async(frame, path):
+    """Kareyi analizi bekletmeden arka planda diske yaz"""
+    def worker():
+        if cv2.imwrite(path, frame):
+            print(f"✅ Fotoğraf kaydedildi: {path}")
+        else:
+            print(f"⚠️ Fotoğraf kaydedilemedi: {path}")
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
+
+
+def analyze_face(image) -> int:
+    """📊 Analiz kısmı (Android uyumlu geliştirilmiş sürüm)
+
+    Bellekteki kareyi (BGR ya da gri ndarray) doğrudan analiz eder; dosya yolu
+    verilirse analyze_face_file kullanılır.
+    """
+    if isinstance(image, str):
+        return analyze_face_file(image)
+    try:
+        face_cascade, emotion_model = load_models()
+        # Model kontrolü
+        if face_cascade is None or emotion_model is None:
+            print("❌ Model dosyaları yüklenemedi - test modu")
+            return 25  # Güvenli test değeri
+
+        if image is None or image.size == 0:
+            print("❌ Görüntü okunamadı.")
+            return 25  # Güvenli değer
+
+        results, hazard = analyze_faces(to_gray(image), emotion_model, FaceDetector(face_cascade))
+
+        if not results:
+            print("😐 Yüz algılanamadı.")
+            return 25  # Güvenli değer
+
+        for x, y, w, h, face_hazard in results:
+            print(f"→ Yüz ({x}, {y}, {w}x{h}): Hazard %{face_hazard}")
+        print(f"→ {len(results)} yüz, en yüksek Hazard: %{hazard}")
+        return hazard
+
+    except Exception as e:
+        print(f"❌ Analiz hatası: {e}")
+        return 25  # Güvenli değer
+
+
+def analyze_face_file(image_path: str) -> int:
+    """Diskteki görüntüyü okuyup analyze_face ile analiz et"""
+    img = cv2.imread(image_path)
+    if img is None:
+        print("❌ Görüntü okunamadı.")
+        return 25  # Güvenli değer
+    return analyze_face(img)
@@ -1,79 +1,80 @@
 import os
 import cv2
-import numpy as np
 import time
-from tensorflow.keras.models import load_model
 from kivy.app import App
 from kivy.uix.screenmanager import Screen
-from kivy.properties import NumericProperty
+from kivy.properties import NumericProperty, BooleanProperty, OptionProperty
 from kivy.clock import Clock
 
 # Android işlemleri için (manuel butonlar için)
 from plyer import sms, call
 
-# 📍 Dosya yolları
-BASE_DIR     = os.path.dirname(__file__)
-MODEL_PATH   = os.path.join(BASE_DIR, 'models', 'emotion_model.h5')
-CASCADE_PATH = os.path.join(BASE_DIR, 'data', 'haarcascade_frontalface_default.xml')
-
-# 😶‍🌫️ Duygu etiketleri (modelinize göre ayarlayın)
-EMOTIONS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
-
-# 🎯 Yüklemeler (Error handling ile)
-try:
-    face_cascade  = cv2.CascadeClassifier(CASCADE_PATH)
-    emotion_model = load_model(MODEL_PATH, compile=False)
-    print("✅ Model ve cascade dosyaları yüklendi")
-except Exception as e:
-    print(f"❌ Model yükleme hatası: {e}")
-    face_cascade = None
-    emotion_model = None
-
-def analyze_face(image_path: str) -> int:
-    """📊 Analiz kısmı (Android uyumlu geliştirilmiş sürüm)"""
-    try:
-        # Model kontrolü
-        if face_cascade is None or emotion_model is None:
-            print("❌ Model dosyaları yüklenemedi - test modu")
-            return 25  # Güvenli test değeri
-        
-        img = cv2.imread(image_path)
-        if img is None:
-            print("❌ Görüntü okunamadı.")
-            return 25  # Güvenli değer
-
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-
-        if len(faces) == 0:
-            print("😐 Yüz algılanamadı.")
-            return 25  # Güvenli değer
-
-        x, y, w, h = faces[0]
-        roi = gray[y:y + h, x:x + w]
-        roi = cv2.resize(roi, (64, 64)).astype("float32") / 255.0
-        roi = np.expand_dims(roi, axis=0)       # (1, 64, 64)
-        roi = np.expand_dims(roi, axis=-1)      # (1, 64, 64, 1)
-
-        preds = emotion_model.predict(roi)[0]
-        fear = float(preds[EMOTIONS.index("fear")])
-        sad = float(preds[EMOTIONS.index("sad")])
-        hazard = int((fear + sad) * 100)
-
-        print(f"→ Fear: {fear:.2f}, Sad: {sad:.2f}, Hazard: %{hazard}")
-        return hazard
-        
-    except Exception as e:
-        print(f"❌ Analiz hatası: {e}")
-        return 25  # Güvenli değer
+# Model yükleme ve analiz kivy'den bağımsız modülde; model ilk ihtiyaçta yüklenir
+from emotion_analyzer import analyze_face, models_ready, save_frame_async
+from camera_stream import HazardStream
 
 class FifthScreen(Screen):
     hazard_status = NumericProperty(0)
     latitude = NumericProperty(35.1856)  # Kıbrıs varsayılan koordinatları
     longitude = NumericProperty(33.3823)
+    # Duygu modelinin arka planda yüklenme durumu
+    model_state = OptionProperty('loading', options=['loading', 'ready', 'failed'])
+    # Canlı analiz: kamera açık kalır, yalnızca süren tehlikede işlem yapılır
+    stream_mode = BooleanProperty(False)
+    # Yakalanan kare isteğe bağlı olarak arka planda diske yazılır
+    save_frames = BooleanProperty(False)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.stream = None
+
+    def on_models_loaded(self, ready):
+        self.model_state = 'ready' if ready else 'failed'
+        print("✅ Yüz analizi hazır" if ready else "⚠️ Yüz analizi test modunda")
 
     def on_pre_enter(self):
-        Clock.schedule_once(lambda dt: self.capture_with_opencv(), 0.5)
+        if self.stream_mode:
+            self.start_stream()
+        else:
+            Clock.schedule_once(lambda dt: self.capture_with_opencv(), 0.5)
+
+    def on_leave(self):
+        self.stop_stream()
+
+    def on_stream_mode(self, instance, enabled):
+        if enabled:
+            self.start_stream()
+        else:
+            self.stop_stream()
+
+    def start_stream(self):
+        if self.stream is not None:
+            return
+        if not models_ready():
+            # Model yüklenmeden (ya da yüklenemediyse) kamera açılmaz
+            print("⚠️ Model hazır değil, canlı analiz başlatılamadı")
+            self.stream_mode = False
+            return
+        self.stream = HazardStream(
+            0,
+            on_result=lambda hazard, smoothed: Clock.schedule_once(
+                lambda dt: setattr(self, 'hazard_status', int(smoothed))),
+            on_alarm=lambda smoothed: Clock.schedule_once(
+                lambda dt: self._on_stream_alarm(smoothed)),
+        )
+        if not self.stream.start():
+            self.stream = None
+            self.stream_mode = False
+
+    def stop_stream(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream = None
+            print("📷 Canlı analiz durduruldu")
+
+    def _on_stream_alarm(self, smoothed):
+        self.hazard_status = int(smoothed)
+        self.handle_analysis_result()
 
     def capture_with_opencv(self):
         print("📸 OpenCV ile kamera açılıyor...")
@@ -92,24 +93,24 @@ class FifthScreen(Screen):
                 cam.read()  # ilk kareler siyah olabilir
 
             ret, frame = cam.read()
+            cam.release()
             if ret and frame is not None:
-                # ✅ Android uyumlu dosya yolu
-                app = App.get_running_app()
-                app_dir = app.user_data_dir
-                photo_path = os.path.join(app_dir, 'latest_face.jpg')
-                
-                cv2.imwrite(photo_path, frame)
-                print(f"✅ Fotoğraf kaydedildi: {photo_path}")
-                cam.release()
-
-                self.hazard_status = analyze_face(photo_path)
+                if self.save_frames:
+                    # ✅ Android uyumlu dosya yolu
+                    app = App.get_running_app()
+                    photo_path = os.path.join(app.user_data_dir, 'latest_face.jpg')
+                    save_frame_async(frame, photo_path)
+
+                # Kare diske yazılıp geri okunmadan bellekte analiz edilir
+                self.hazard_status = analyze_face(frame)
+                # Analiz modeli yüklemeyi denemiş olur; sonuç hazır ya da hatalıdır
+                self.model_state = 'ready' if models_ready() else 'failed'
                 print(f"😨 Analiz sonucu: Tehlike seviyesi %{self.hazard_status}")
                 
                 self.handle_analysis_result()
                 
             else:
                 print("⚠️ Görüntü alınamadı.")
-                cam.release()
                 # Test değeri atayıp devam et
                 self.hazard_status = 30
                 self.handle_analysis_result()
@@ -0,0 +1,111 @@
+import os
+import cv2
+
+BASE_DIR = os.path.dirname(__file__)
+# OpenCV DNN yüz algılayıcısı (res10 SSD); dosyalar pakette yoksa Haar kullanılır
+DNN_CONFIG_PATH = os.path.join(BASE_DIR, 'data', 'deploy.prototxt')
+DNN_MODEL_PATH  = os.path.join(BASE_DIR, 'data', 'res10_300x300_ssd_iter_140000.caffemodel')
+
+# Algılamadan önce karenin uzun kenarı en fazla bu kadar piksele küçültülür
+DETECT_MAX_SIDE = 320
+# Takip bölgesi: son yüz kutusu her yönde kutu boyutunun bu oranı kadar büyütülür
+TRACK_MARGIN = 0.5
+# Takip sırasında bile bu kadar karede bir tüm kare taranır (yeni yüzler için)
+REDETECT_EVERY = 10
+
+
+class FaceDetector:
+    """Küçültülmüş karede yüz algılar ve kutuları özgün koordinatlara geri taşır.
+
+    track=True ile ardışık karelerde yalnızca son yüzlerin çevresi taranır; orada yüz
+    bulunamazsa ya da REDETECT_EVERY kare geçtiyse tüm kareye dönülür.
+    """
+
+    def __init__(self, face_cascade=None, backend="haar", max_side=DETECT_MAX_SIDE,
+                 track_margin=TRACK_MARGIN, redetect_every=REDETECT_EVERY,
+                 dnn_config=DNN_CONFIG_PATH, dnn_model=DNN_MODEL_PATH, dnn_confidence=0.6):
+        self.face_cascade = face_cascade
+        self.max_side = max_side
+        self.track_margin = track_margin
+        self.redetect_every = redetect_every
+        self.dnn_confidence = dnn_confidence
+        self.net = None
+        if backend == "dnn":
+            try:
+                self.net = cv2.dnn.readNetFromCaffe(dnn_config, dnn_model)
+            except Exception as e:
+                print(f"⚠️ DNN yüz algılayıcısı yüklenemedi, Haar kullanılacak: {e}")
+        self.backend = "dnn" if self.net is not None else "haar"
+        self.last_faces = []
+        self._since_full = 0
+
+    def reset(self):
+        self.last_faces = []
+        self._since_full = 0
+
+    def detect(self, image, track=False):
+        """Gri ya da BGR görüntüdeki yüzleri [(x, y, w, h)] olarak döndür"""
+        if track and self.last_faces and self._since_full < self.redetect_every:
+            x0, y0, x1, y1 = self._track_region(image.shape)
+            # Bölge tüm kareyle aynı oranda küçültülür; yüzler aynı piksel boyutunda aranır
+            faces = self._detect_scaled(image[y0:y1, x0:x1], self._scale_for(image))
+            if faces:
+                self._since_full += 1
+                self.last_faces = [(x + x0, y + y0, w, h) for x, y, w, h in faces]
+                return self.last_faces
+
+        self._since_full = 0
+        self.last_faces = self._detect_scaled(image)
+        return self.last_faces
+
+    def _track_region(self, shape):
+        """Son yüzleri kapsayan, pay eklenmiş ve kareye kırpılmış bölge"""
+        x0 = min(x for x, _, _, _ in self.last_faces)
+        y0 = min(y for _, y, _, _ in self.last_faces)
+        x1 = max(x + w for x, _, w, _ in self.last_faces)
+        y1 = max(y + h for _, y, _, h in self.last_faces)
+        pad_x = int((x1 - x0) * self.track_margin)
+        pad_y = int((y1 - y0) * self.track_margin)
+        return (max(x0 - pad_x, 0), max(y0 - pad_y, 0),
+                min(x1 + pad_x, shape[1]), min(y1 + pad_y, shape[0]))
+
+    def _scale_for(self, image):
+        return min(self.max_side / max(image.shape[:2]), 1.0)
+
+    def _detect_scaled(self, image, scale=None):
+        height, width = image.shape[:2]
+        scale = self._scale_for(image) if scale is None else scale
+        small = image
+        if scale < 1.0:
+            small = cv2.resize(image, (max(int(width * scale), 1), max(int(height * scale), 1)),
+                               interpolation=cv2.INTER_AREA)
+
+        if self.backend == "dnn":
+            faces = self._detect_dnn(small)
+        else:
+            faces = self._detect_haar(small)
+        return [(int(x / scale), int(y / scale), int(w / scale), int(h / scale)) for x, y, w, h in faces]
+
+    def _detect_haar(self, image):
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return [tuple(face) for face in self.face_cascade.detectMultiScale(image, 1.3, 5)]
+
+    def _detect_dnn(self, image):
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        height, width = image.shape[:2]
+        blob = cv2.dnn.blobFromImage(cv2.resize(image, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+        faces = []
+        for detection in detections:
+            if detection[2] < self.dnn_confidence:
+                continue
+            x0 = max(int(detection[3] * width), 0)
+            y0 = max(int(detection[4] * height), 0)
+            x1 = min(int(detection[5] * width), width)
+            y1 = min(int(detection[6] * height), height)
+            if x1 > x0 and y1 > y0:
+                faces.append((x0, y0, x1 - x0, y1 - y0))
+        return faces
@@ -0,0 +1,109 @@
+import threading
+import time
+from database import get_connection
+
+# Önek araması için alt sınırın üstündeki en büyük karakter
+_PREFIX_END = "\U0010ffff"
+
+
+class GeocodeCache:
+    """Adres arama sonuçları için LRU tahliyeli ve önek aramalı yerel önbellek"""
+
+    def __init__(self, db_path="users.db", max_entries=500, min_prefix_len=4):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.min_prefix_len = min_prefix_len
+        # İsabet oranı sayaçları
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.init_table()
+
+    def init_table(self):
+        conn = get_connection(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                query TEXT PRIMARY KEY,
+                lat REAL,
+                lon REAL,
+                display_name TEXT,
+                last_used REAL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_geocode_last_used ON geocode_cache (last_used)')
+        conn.commit()
+
+    @staticmethod
+    def normalize(addr):
+        """Adresi küçük harfe çevir, boşlukları ve kenar noktalamalarını sadeleştir"""
+        return " ".join(addr.casefold().replace(",", " ").split()).strip(" .;")
+
+    def get(self, addr):
+        """Önbellekteki sonucu (lat, lon, display_name) olarak döndür, yoksa None"""
+        key = self.normalize(addr)
+        if not key:
+            return None
+
+        conn = get_connection(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT query, lat, lon, display_name FROM geocode_cache WHERE query = ?', (key,))
+        row = cursor.fetchone()
+        exact = row is not None
+
+        if not exact and len(key) >= self.min_prefix_len:
+            # Kısmi adres: daha önce aranmış en son adresi kullan (birincil anahtar indeksiyle aralık taraması)
+            cursor.execute('''
+                SELECT query, lat, lon, display_name FROM geocode_cache
+                WHERE query >= ? AND query < ?
+                ORDER BY last_used DESC
+                LIMIT 1
+            ''', (key, key + _PREFIX_END))
+            row = cursor.fetchone()
+
+        if row:
+            cursor.execute('UPDATE geocode_cache SET last_used = ? WHERE query = ?', (time.time(), row[0]))
+            conn.commit()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            elif exact:
+                self.hits += 1
+            else:
+                self.prefix_hits += 1
+
+        if row is None:
+            return None
+        return row[1], row[2], row[3]
+
+    def put(self, addr, lat, lon, display_name=""):
+        """Sonucu kaydet ve kapasite aşıldıysa en eski kullanılanları sil"""
+        key = self.normalize(addr)
+        if not key:
+            return
+
+        conn = get_connection(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO geocode_cache (query, lat, lon, display_name, last_used)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (key, lat, lon, display_name, time.time()))
+        cursor.execute('''
+            DELETE FROM geocode_cache WHERE query NOT IN (
+                SELECT query FROM geocode_cache ORDER BY last_used DESC LIMIT ?
+            )
+        ''', (self.max_entries,))
+        conn.commit()
+
+    def stats(self):
+        """Önbellek isabet sayaçlarını döndür"""
+        with self._lock:
+            total = self.hits + self.prefix_hits + self.misses
+            return {
+                'hits': self.hits,
+                'prefix_hits': self.prefix_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.prefix_hits) / total if total else 0.0,
+            }
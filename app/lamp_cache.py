@@ -0,0 +1,143 @@
+import math
+import time
+import threading
+import numpy as np
+from database import get_connection, close_connection
+
+# Karo boyutu (derece) ve varsayılan geçerlilik süresi (saniye)
+TILE_SIZE = 0.02
+DEFAULT_TTL = 7 * 24 * 3600
+
+# Lamba türleri küçük bir tamsayı koduyla saklanır
+LAMP_TYPES = ('street_lamp', 'lighting', 'way_lighting')
+# Paketlenmiş (hizalamasız) kayıt: 8 bayt lat + 8 bayt lon + 1 bayt tür kodu
+LAMP_DTYPE = np.dtype([('lat', '<f8'), ('lon', '<f8'), ('type', 'u1')])
+
+
+def lamp_type_code(lamp_type):
+    """Tür adını tamsayı koduna çevir, bilinmeyen türler 'lighting' sayılır"""
+    if lamp_type in LAMP_TYPES:
+        return LAMP_TYPES.index(lamp_type)
+    return LAMP_TYPES.index('lighting')
+
+
+def empty_lamps():
+    return np.empty(0), np.empty(0), np.empty(0, dtype=np.uint8)
+
+
+def encode_lamps(lamps):
+    """(lats, lons, codes) dizilerini paketlenmiş ikili veriye çevir"""
+    lats, lons, codes = lamps
+    records = np.empty(len(lats), dtype=LAMP_DTYPE)
+    records['lat'] = lats
+    records['lon'] = lons
+    records['type'] = codes
+    return records.tobytes()
+
+
+def decode_lamps(blob):
+    """encode_lamps ile üretilen ikili veriyi (lats, lons, codes) dizilerine geri çevir"""
+    records = np.frombuffer(blob, dtype=LAMP_DTYPE)
+    return (np.ascontiguousarray(records['lat']),
+            np.ascontiguousarray(records['lon']),
+            np.ascontiguousarray(records['type']))
+
+
+class LampTileCache:
+    """Overpass sokak lambası verileri için sabit enlem/boylam karolarına bölünmüş SQLite önbelleği"""
+
+    def __init__(self, db_path="lamp_cache.db", tile_size=TILE_SIZE, ttl=DEFAULT_TTL):
+        self.db_path = db_path
+        self.tile_size = tile_size
+        self.ttl = ttl
+        self.init_table()
+
+    def init_table(self):
+        conn = get_connection(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS lamp_tiles (
+                tile_lat INTEGER,
+                tile_lon INTEGER,
+                fetched_at REAL,
+                lamps BLOB,
+                PRIMARY KEY (tile_lat, tile_lon)
+            )
+        ''')
+        conn.commit()
+
+    def tile_of(self, lat, lon):
+        return (math.floor(lat / self.tile_size), math.floor(lon / self.tile_size))
+
+    def tile_bounds(self, key):
+        """Karonun (lat_min, lat_max, lon_min, lon_max) sınırlarını döndür"""
+        i, j = key
+        return (i * self.tile_size, (i + 1) * self.tile_size,
+                j * self.tile_size, (j + 1) * self.tile_size)
+
+    def tiles_for_bbox(self, lat_min, lat_max, lon_min, lon_max):
+        """Alanı kaplayan tüm karo anahtarlarını getir"""
+        i0, j0 = self.tile_of(lat_min, lon_min)
+        i1, j1 = self.tile_of(lat_max, lon_max)
+        return [(i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)]
+
+    def get_tiles(self, keys, now=None):
+        """Süresi dolmamış karoları {anahtar: (fetched_at, (lats, lons, codes))} olarak getir"""
+        if not keys:
+            return {}
+        now = time.time() if now is None else now
+        wanted = set(keys)
+        i_values = [k[0] for k in keys]
+        j_values = [k[1] for k in keys]
+
+        conn = get_connection(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT tile_lat, tile_lon, fetched_at, lamps
+            FROM lamp_tiles
+            WHERE tile_lat BETWEEN ? AND ? AND tile_lon BETWEEN ? AND ? AND fetched_at >= ?
+        ''', (min(i_values), max(i_values), min(j_values), max(j_values), now - self.ttl))
+        rows = cursor.fetchall()
+
+        return {
+            (i, j): (fetched_at, decode_lamps(blob))
+            for i, j, fetched_at, blob in rows
+            if (i, j) in wanted
+        }
+
+    def put_tiles(self, tiles, fetched_at=None):
+        """{anahtar: (lats, lons, codes)} sözlüğündeki karoları kaydet (boş karolar da saklanır)"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        conn = get_connection(self.db_path)
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO lamp_tiles (tile_lat, tile_lon, fetched_at, lamps)
+            VALUES (?, ?, ?, ?)
+        ''', [(i, j, fetched_at, encode_lamps(lamps)) for (i, j), lamps in tiles.items()])
+        conn.commit()
+
+    def purge_expired(self, now=None):
+        """Süresi dolmuş karoları sil ve silinen karo sayısını döndür"""
+        now = time.time() if now is None else now
+        conn = get_connection(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM lamp_tiles WHERE fetched_at < ?', (now - self.ttl,))
+        deleted = cursor.rowcount
+        conn.commit()
+        return deleted
+
+    def start_maintenance(self):
+        """Süresi dolmuş karoların temizliğini arka planda çalıştır"""
+        def worker():
+            try:
+                deleted = self.purge_expired()
+                if deleted:
+                    print(f"🧹 Süresi dolmuş lamba karoları silindi: {deleted}")
+            except Exception as e:
+                print(f"⚠️ Lamba önbelleği bakımı başarısız: {e}")
+            finally:
+                close_connection(self.db_path)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,124 @@
+import math
+import numpy as np
+
+# Dünya'nın yarıçapı (km)
+EARTH_RADIUS = 6371
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """İki nokta arasındaki mesafeyi hesapla (km)"""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+
+    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * \
+        math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+    return EARTH_RADIUS * c
+
+
+def degree_window(lat, radius):
+    """Verilen yarıçapı (km) kapsayan enlem/boylam açıklığını derece olarak döndür"""
+    angular = radius / EARTH_RADIUS
+    dlat = math.degrees(angular)
+    # hav(d) >= cos(lat1) * cos(lat2) * hav(dlon) eşitsizliğinden güvenli boylam sınırı
+    cos1 = math.cos(math.radians(lat))
+    cos2 = math.cos(math.radians(min(abs(lat) + dlat, 90)))
+    denom = cos1 * cos2
+    h = math.sin(angular / 2) ** 2
+    if denom <= 0 or h >= denom:
+        return dlat, 180.0
+    dlon = math.degrees(2 * math.asin(math.sqrt(h / denom)))
+    return dlat, dlon
+
+
+class LampGridIndex:
+    """Sokak lambaları için sabit boyutlu enlem/boylam hücrelerinden oluşan ızgara indeksi"""
+
+    def __init__(self, lats, lons, cell_size=0.002):
+        self.cell_size = cell_size
+        self.cells = {}
+        if not len(lats):
+            return
+        ci = np.floor(np.asarray(lats) / cell_size).astype(np.int64)
+        cj = np.floor(np.asarray(lons) / cell_size).astype(np.int64)
+        # Hücreye göre sırala; kararlı sıralama hücre içinde orijinal sırayı korur
+        order = np.lexsort((cj, ci))
+        sci, scj = ci[order], cj[order]
+        breaks = np.flatnonzero((np.diff(sci) != 0) | (np.diff(scj) != 0)) + 1
+        starts = np.concatenate(([0], breaks))
+        ends = np.concatenate((breaks, [len(order)]))
+        for a, b in zip(starts, ends):
+            self.cells[(int(sci[a]), int(scj[a]))] = order[a:b]
+
+    def _cell_of(self, lat, lon):
+        return (math.floor(lat / self.cell_size), math.floor(lon / self.cell_size))
+
+    degree_window = staticmethod(degree_window)
+
+    def candidates(self, lat, lon, radius):
+        """Yarıçap penceresiyle kesişen hücrelerdeki lamba indekslerini getir"""
+        dlat, dlon = degree_window(lat, radius)
+        i0, j0 = self._cell_of(lat - dlat, lon - dlon)
+        i1, j1 = self._cell_of(lat + dlat, lon + dlon)
+        buckets = []
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                bucket = self.cells.get((i, j))
+                if bucket is not None:
+                    buckets.append(bucket)
+        if not buckets:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(buckets))
+
+
+def count_near_points(sorted_lats, sorted_lons, lats, lons, radius=0.001, chunk_size=256, max_pairs=1_000_000):
+    """Her nokta için yarıçap (km) içindeki lamba sayısını vektörel olarak hesapla.
+
+    sorted_lats/sorted_lons enleme göre sıralı lamba koordinatlarıdır.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    counts = np.zeros(len(lats), dtype=np.int64)
+    if not len(sorted_lats) or not len(lats):
+        return counts
+
+    lamps = (sorted_lats, sorted_lons)
+    for start in range(0, len(lats), chunk_size):
+        _count_chunk(lamps, lats, lons, counts, start, min(start + chunk_size, len(lats)), radius, max_pairs)
+    return counts
+
+
+def _count_chunk(lamps, lats, lons, counts, start, end, radius, max_pairs):
+    sorted_lats, sorted_lons = lamps
+    plats = lats[start:end]
+    plons = lons[start:end]
+    # Parçanın en büyük |enlem| değeri en geniş boylam penceresini verir
+    dlat, dlon = degree_window(float(np.abs(plats).max()), radius)
+
+    lo = np.searchsorted(sorted_lats, plats.min() - dlat, side="left")
+    hi = np.searchsorted(sorted_lats, plats.max() + dlat, side="right")
+    if lo >= hi:
+        return
+    cand_lats = sorted_lats[lo:hi]
+    cand_lons = sorted_lons[lo:hi]
+    mask = (cand_lons >= plons.min() - dlon) & (cand_lons <= plons.max() + dlon)
+    cand_lats = cand_lats[mask]
+    cand_lons = cand_lons[mask]
+    if not len(cand_lats):
+        return
+
+    # Bellek sınırı aşılırsa parçayı ikiye böl
+    if len(cand_lats) * (end - start) > max_pairs and end - start > 1:
+        mid = (start + end) // 2
+        _count_chunk(lamps, lats, lons, counts, start, mid, radius, max_pairs)
+        _count_chunk(lamps, lats, lons, counts, mid, end, radius, max_pairs)
+        return
+
+    lat1 = np.radians(plats)[:, None]
+    lat2 = np.radians(cand_lats)[None, :]
+    dphi = np.radians(cand_lats[None, :] - plats[:, None])
+    dlmb = np.radians(cand_lons[None, :] - plons[:, None])
+    a = np.sin(dphi / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlmb / 2) ** 2
+    dist = EARTH_RADIUS * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    counts[start:end] += np.count_nonzero(dist <= radius, axis=1)
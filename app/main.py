@@ -1,5 +1,8 @@
 import os
-import sqlite3
+import time
+
+# Açılış süresi ölçümü için başlangıç zamanı
+APP_START = time.perf_counter()
 from kivy.app import App
 from kivy.uix.screenmanager import Screen, ScreenManager
 from kivy.lang import Builder
@@ -10,6 +13,7 @@ from kivy.clock import Clock
 from score_system import ScoreSystemScreen
 from safety_map import SeventhScreen
 from face_analysis import FifthScreen
+from emotion_analyzer import warm_up_async
 from emergency_screen import EmergencyScreen
 from session_manager import SessionManager  # YENİ IMPORT
 
@@ -62,31 +66,8 @@ class SecondScreen(Screen):
             print("⚠️ Lütfen tüm alanları doldurun!")
 
     def save_user_to_db(self, id_number, password, birth_year, phone_number):
-        conn = sqlite3.connect("users.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                id_number TEXT,
-                password TEXT,
-                birth_year TEXT,
-                phone_number TEXT
-            )
-        """)
-        
-        try:
-            cursor.execute("""
-                INSERT INTO users (id_number, password, birth_year, phone_number)
-                VALUES (?, ?, ?, ?)
-            """, (id_number, password, birth_year, phone_number))
-            user_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
-            return user_id
-        except Exception as e:
-            print(f"Veritabanı hatası: {e}")
-            conn.close()
-            return None
+        app = App.get_running_app()
+        return app.session_manager.create_user(id_number, password, birth_year, phone_number)
 
     def clear_fields(self):
         self.ids.id_input.text = ""
@@ -145,12 +126,7 @@ class EighthScreen(Screen):
             user_info = app.session_manager.get_active_user()
             
             if user_info:
-                conn = sqlite3.connect("users.db")
-                cursor = conn.cursor()
-                cursor.execute("UPDATE users SET phone_number = ? WHERE id = ?", 
-                             (new_phone, user_info['id']))
-                conn.commit()
-                conn.close()
+                app.session_manager.update_phone_number(user_info['id'], new_phone)
                 print("✅ Telefon numarası güncellendi!")
             else:
                 print("❌ Kullanıcı bulunamadı!")
@@ -212,11 +188,41 @@ class NEUALHELPPASSApp(App):
         self.check_auto_login(sm)
         
         return sm
+
+    def flush_scores(self):
+        """Bekleyen puanları kalıcı olarak yaz"""
+        if self.root:
+            self.root.get_screen("sixth").score_writer.flush(durable=True)
+
+    def on_pause(self):
+        self.flush_scores()
+        return True
+
+    def on_stop(self):
+        if self.root:
+            self.root.get_screen("sixth").score_writer.close()
+            self.root.get_screen("fifth").stop_stream()
+            self.root.get_screen("seventh").shutdown()
+
+    def on_start(self):
+        print(f"⏱️ Arayüz hazır: {time.perf_counter() - APP_START:.2f} s")
+        # Eski oturum kayıtlarını arayüzü bekletmeden temizle
+        self.session_manager.start_maintenance()
+        # Süresi dolmuş lamba karoları da aynı şekilde silinir
+        self.root.get_screen("seventh").lamp_manager.tile_cache.start_maintenance()
+        # Duygu modeli ilk kare çizildikten sonra arka planda yüklenir
+        Window.bind(on_flip=self._warm_up_models)
+
+    def _warm_up_models(self, *args):
+        Window.unbind(on_flip=self._warm_up_models)
+        print(f"⏱️ İlk kare çizildi: {time.perf_counter() - APP_START:.2f} s")
+        fifth = self.root.get_screen("fifth")
+        warm_up_async(lambda ready: Clock.schedule_once(lambda dt: fifth.on_models_loaded(ready)))
     
     def check_auto_login(self, screen_manager):
         """Uygulama açılırken otomatik giriş kontrolü"""
-        if self.session_manager.is_user_logged_in():
-            user_info = self.session_manager.get_active_user()
+        user_info = self.session_manager.get_active_user()
+        if user_info:
             print(f"✅ Otomatik giriş: {user_info['id_number']}")
             
             # Doğrudan 4. sayfaya yönlendir
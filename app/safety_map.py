@@ -1,15 +1,22 @@
 import requests
 import json
 import math
+import threading
+from collections import OrderedDict
+import numpy as np
+from concurrent.futures import Future, ThreadPoolExecutor
 from kivy.uix.screenmanager import Screen
 from kivy.properties import StringProperty
 from kivy_garden.mapview import MapMarker, MapSource, MapView, MapLayer
 from kivy.uix.popup import Popup
 from kivy.uix.label import Label
-from kivy.graphics import Color, Line
+from kivy.graphics import Color, Line, PushMatrix, PopMatrix, Translate
 from kivy.metrics import dp
 from kivy.clock import Clock
 
+from street_lamps import StreetLampManager
+from geocode_cache import GeocodeCache
+
 try:
     from plyer import gps
     GPS_AVAILABLE = True
@@ -28,114 +35,199 @@ GOOGLE_MAPS = MapSource(
 # API URL'leri
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 OSRM_URL = "https://router.project-osrm.org/route/v1/driving/{lon1},{lat1};{lon2},{lat2}"
-OVERPASS_URL = "https://overpass-api.de/api/interpreter"
-
-class StreetLampManager:
-    def __init__(self):
-        self.street_lamps = []
-        self.loaded = False
-    
-    def load_street_lamps_for_area(self, lat_min, lat_max, lon_min, lon_max):
-        """Belirtilen alan için sokak lambası verilerini çek"""
-        overpass_query = f"""
-        [out:json][timeout:25];
-        (
-          node["highway"="street_lamp"]({lat_min},{lon_min},{lat_max},{lon_max});
-          node["amenity"="lighting"]({lat_min},{lon_min},{lat_max},{lon_max});
-          way["lit"="yes"]["highway"]({lat_min},{lon_min},{lat_max},{lon_max});
-        );
-        out geom;
-        """
-        
-        try:
-            response = requests.post(OVERPASS_URL, data=overpass_query, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                self.street_lamps = []
-                
-                for element in data.get('elements', []):
-                    if element['type'] == 'node':
-                        self.street_lamps.append({
-                            'lat': element['lat'],
-                            'lon': element['lon'],
-                            'type': element.get('tags', {}).get('highway', 'lighting')
-                        })
-                    elif element['type'] == 'way' and 'geometry' in element:
-                        # Aydınlatmalı yolların geometrisini ekle
-                        for coord in element['geometry']:
-                            self.street_lamps.append({
-                                'lat': coord['lat'],
-                                'lon': coord['lon'],
-                                'type': 'way_lighting'
-                            })
-                
-                self.loaded = True
-                print(f"Yüklenen sokak lambası sayısı: {len(self.street_lamps)}")
-                return True
-            else:
-                print(f"Overpass API hatası: {response.status_code}")
-                return False
-        except Exception as e:
-            print(f"Sokak lambası veri çekme hatası: {e}")
-            return False
-    
-    def get_lamps_near_point(self, lat, lon, radius=0.001):
-        """Belirtilen noktaya yakın sokak lambalarını getir"""
-        nearby_lamps = []
-        for lamp in self.street_lamps:
-            distance = self.haversine_distance(lat, lon, lamp['lat'], lamp['lon'])
-            if distance <= radius:
-                nearby_lamps.append(lamp)
-        return nearby_lamps
-    
-    @staticmethod
-    def haversine_distance(lat1, lon1, lat2, lon2):
-        """İki nokta arasındaki mesafeyi hesapla (km)"""
-        R = 6371  # Dünya'nın yarıçapı (km)
-        
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        
-        a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * \
-            math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        
-        return R * c
+
+class RouteCache:
+    """Başlangıç/varış noktaları ızgaraya oturtulmuş, boyutu sınırlı (LRU) rota önbelleği"""
+
+    def __init__(self, max_entries=20, snap=0.001):
+        self.max_entries = max_entries
+        self.snap = snap
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def key_for(self, origin, dest):
+        return tuple(round(v / self.snap) for v in (origin[0], origin[1], dest[0], dest[1]))
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+def douglas_peucker(points, tolerance):
+    """Douglas–Peucker sadeleştirmesi: korunacak noktaların indekslerini döndür"""
+    n = len(points)
+    if n <= 2 or tolerance <= 0:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        seg = end - start
+        seg_len = math.hypot(seg[0], seg[1])
+        inner = points[first + 1:last] - start
+        if seg_len == 0:
+            dist = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            dist = np.abs(inner[:, 0] * seg[1] - inner[:, 1] * seg[0]) / seg_len
+        idx = int(np.argmax(dist))
+        if dist[idx] > tolerance:
+            split = first + 1 + idx
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
+
 
 class SafePolylineLayer(MapLayer):
+    """Rota çizgisi: aynı renk grubundaki segmentler tek Line olarak, görünür alana kırpılıp
+    yakınlaştırma seviyesine göre sadeleştirilerek çizilir; kaydırmada sadece öteleme güncellenir."""
+
+    color_buckets = 10
+    simplify_tolerance = 1.0  # piksel
+
     def __init__(self, coords, safety_scores=None, **kwargs):
         super().__init__(**kwargs)
-        self.coords = coords
-        self.safety_scores = safety_scores or []
+        self.coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        self.safety_scores = np.asarray(safety_scores if safety_scores is not None else [], dtype=float)
+        # Web Mercator dünya koordinatları bir kez hesaplanır
+        lat = np.radians(np.clip(self.coords[:, 0], -85.0511, 85.0511))
+        self.world = np.column_stack((
+            (self.coords[:, 1] + 180.0) / 360.0,
+            np.log(np.tan(np.pi / 4 + lat / 2)),
+        ))
+        self.runs = self._build_runs()
+        self._simplified = {}
+        self._translate = None
+        self._built_scale = None
+        self._built_region = None
+
+    def _build_runs(self):
+        """Ardışık aynı renk grubundaki segmentleri (grup, nokta indeksleri) koşularına ayır"""
+        n = len(self.coords)
+        if n < 2:
+            return []
+        if not len(self.safety_scores):
+            return [(None, np.arange(n))]
+
+        scores = np.zeros(n - 1)
+        m = min(n - 1, len(self.safety_scores))
+        scores[:m] = self.safety_scores[:m]
+        max_score = self.safety_scores.max()
+        normalized = scores / max_score if max_score > 0 else scores * 0
+        buckets = np.rint(normalized * (self.color_buckets - 1)).astype(int)
+
+        breaks = np.flatnonzero(np.diff(buckets)) + 1
+        starts = np.concatenate(([0], breaks))
+        ends = np.concatenate((breaks, [n - 1]))
+        # Segment i, i ve i+1 noktalarını birleştirir
+        return [(int(buckets[a]), np.arange(a, b + 1)) for a, b in zip(starts, ends)]
+
+    def _affine(self, mv):
+        """Dünya koordinatlarından pencere koordinatlarına (ölçek, öteleme) dönüşümü"""
+        lat_a, lon_a = self.coords[:, 0].min(), self.coords[:, 1].min()
+        lat_b, lon_b = self.coords[:, 0].max(), self.coords[:, 1].max()
+        if lat_b - lat_a < 1e-6:
+            lat_b = lat_a + 0.01
+        if lon_b - lon_a < 1e-6:
+            lon_b = lon_a + 0.01
+        xa, ya = mv.get_window_xy_from(lat_a, lon_a, mv.zoom)
+        xb, yb = mv.get_window_xy_from(lat_b, lon_b, mv.zoom)
+        wa = np.array([(lon_a + 180.0) / 360.0, math.log(math.tan(math.pi / 4 + math.radians(lat_a) / 2))])
+        wb = np.array([(lon_b + 180.0) / 360.0, math.log(math.tan(math.pi / 4 + math.radians(lat_b) / 2))])
+        scale = np.array([xb - xa, yb - ya]) / (wb - wa)
+        offset = np.array([xa, ya]) - scale * wa
+        return scale, offset
+
+    def _simplified_runs(self, zoom, scale):
+        """Yakınlaştırma seviyesine göre sadeleştirilmiş koşuları önbellekten getir"""
+        if zoom not in self._simplified:
+            runs = []
+            for bucket, idx in self.runs:
+                pts = self.world[idx] * scale
+                keep = douglas_peucker(pts, self.simplify_tolerance)
+                runs.append((bucket, self.world[idx][keep]))
+            self._simplified[zoom] = runs
+        return self._simplified[zoom]
 
     def reposition(self):
         mv: MapView = self.parent
-        if not self.coords or not mv:
+        if not self.runs or not mv:
             return
+
+        scale, offset = self._affine(mv)
+        # Görünür alan (öteleme öncesi koordinatlarda)
+        visible = (mv.x - offset[0], mv.y - offset[1], mv.right - offset[0], mv.top - offset[1])
+
+        same_scale = self._built_scale is not None and np.allclose(scale, self._built_scale, rtol=1e-9)
+        if same_scale and self._inside_region(visible):
+            # Sadece kaydırma: çizgileri yeniden üretmeden ötelemeyi güncelle
+            self._translate.xy = (float(offset[0]), float(offset[1]))
+            return
+
+        self._rebuild(mv.zoom, scale, offset, visible)
+
+    def _inside_region(self, visible):
+        r = self._built_region
+        return (r is not None and visible[0] >= r[0] and visible[1] >= r[1]
+                and visible[2] <= r[2] and visible[3] <= r[3])
+
+    def _rebuild(self, zoom, scale, offset, visible):
+        # Kaydırmada sık yeniden çizim olmasın diye her yönde bir ekran genişliği pay bırakılır
+        w = visible[2] - visible[0]
+        h = visible[3] - visible[1]
+        region = (visible[0] - w, visible[1] - h, visible[2] + w, visible[3] + h)
+
         self.canvas.clear()
-        
         with self.canvas:
-            if self.safety_scores:
-                # Güvenlik skoruna göre renk
-                max_score = max(self.safety_scores) if self.safety_scores else 1
-                for i, (lat, lon) in enumerate(self.coords[:-1]):
-                    score = self.safety_scores[i] if i < len(self.safety_scores) else 0
-                    normalized_score = score / max_score if max_score > 0 else 0
-                    
-                    # Yeşil (güvenli) -> Kırmızı (güvensiz)
-                    Color(1 - normalized_score, normalized_score, 0, 1)
-                    
-                    x1, y1 = mv.get_window_xy_from(lat, lon, mv.zoom)
-                    x2, y2 = mv.get_window_xy_from(self.coords[i+1][0], self.coords[i+1][1], mv.zoom)
-                    Line(points=[x1, y1, x2, y2], width=4)
-            else:
-                # Varsayılan mavi renk
-                Color(0, 0.6, 1, 1)
-                pts = []
-                for lat, lon in self.coords:
-                    x, y = mv.get_window_xy_from(lat, lon, mv.zoom)
-                    pts.extend([x, y])
-                Line(points=pts, width=3)
+            PushMatrix()
+            self._translate = Translate(float(offset[0]), float(offset[1]))
+            for bucket, world in self._simplified_runs(zoom, scale):
+                pts = world * scale
+                for part in self._clip(pts, region):
+                    if bucket is None:
+                        # Varsayılan mavi renk
+                        Color(0, 0.6, 1, 1)
+                        Line(points=part.ravel().tolist(), width=3)
+                    else:
+                        # Yeşil (güvenli) -> Kırmızı (güvensiz)
+                        normalized_score = bucket / (self.color_buckets - 1)
+                        Color(1 - normalized_score, normalized_score, 0, 1)
+                        Line(points=part.ravel().tolist(), width=4)
+            PopMatrix()
+
+        self._built_scale = scale
+        self._built_region = region
+
+    @staticmethod
+    def _clip(pts, region):
+        """Bölgeyle kesişen ardışık segmentleri ayrı çoklu çizgiler olarak döndür"""
+        if len(pts) < 2:
+            return []
+        x0, y0 = np.minimum(pts[:-1], pts[1:]).T
+        x1, y1 = np.maximum(pts[:-1], pts[1:]).T
+        inside = (x1 >= region[0]) & (x0 <= region[2]) & (y1 >= region[1]) & (y0 <= region[3])
+        if inside.all():
+            return [pts]
+        if not inside.any():
+            return []
+        edges = np.diff(np.concatenate(([0], inside.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        return [pts[a:b + 1] for a, b in zip(starts, ends)]
 
 class SeventhScreen(Screen):
     origin_text = StringProperty("")
@@ -149,6 +241,14 @@ class SeventhScreen(Screen):
         self.current_lat = None
         self.current_lon = None
         self.lamp_manager = StreetLampManager()
+        self.geocode_cache = GeocodeCache()
+        self.route_cache = RouteCache()
+        # Ağ istekleri için arka plan iş havuzu ve aktif arama numarası
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.search_id = 0
+        # Arama numarasına göre başlatılan işler; arama iş parçacıklarıyla paylaşıldığı için kilitli
+        self.pending_futures = {}
+        self.futures_lock = threading.Lock()
 
     def on_pre_enter(self):
         mv: MapView = self.ids.map2
@@ -165,6 +265,8 @@ class SeventhScreen(Screen):
             setattr(self, attr, None)
         
         self.origin_text = self.dest_text = self.route_info = self.loading_status = ""
+        # Ekrandan önce başlamış aramaların sonuçları artık uygulanmaz
+        self._new_search()
 
         if GPS_AVAILABLE:
             self.start_gps()
@@ -292,138 +394,253 @@ class SeventhScreen(Screen):
 
     def calculate_route_safety(self, coords):
         """Rota boyunca güvenlik skoru hesapla"""
-        safety_scores = []
-        lamp_radius = 0.0005  
-        
-        for lat, lon in coords:
-            nearby_lamps = self.lamp_manager.get_lamps_near_point(lat, lon, lamp_radius)
-            safety_score = len(nearby_lamps)
-            safety_scores.append(safety_score)
-        
-        return safety_scores
+        scores, _ = self.calculate_routes_safety([coords])
+        return scores[0].tolist()
+
+    def calculate_routes_safety(self, routes_coords):
+        """Tüm alternatif rotaları tek seferde skorla: nokta skorları ve rota toplamları"""
+        lamp_radius = 0.0005
+        arrays = [np.asarray(coords, dtype=float).reshape(-1, 2) for coords in routes_coords]
+        if not arrays:
+            return [], np.zeros(0, dtype=np.int64)
+
+        points = np.concatenate(arrays)
+        counts = self.lamp_manager.count_lamps_near_points(points[:, 0], points[:, 1], lamp_radius)
+
+        splits = np.cumsum([len(a) for a in arrays])[:-1]
+        per_route = np.split(counts, splits)
+        totals = np.array([int(c.sum()) for c in per_route], dtype=np.int64)
+        return per_route, totals
+
+    def show_error(self, text, width=300):
+        Popup(title="Hata", content=Label(text=text), 
+              size_hint=(None,None), size=(dp(width),dp(120))).open()
 
     def on_search(self):
-        mv: MapView = self.ids.map2
         if not getattr(self, "origin_marker", None):
-            Popup(title="Hata", content=Label(text="Önce konumunuzu ayarlayın"), 
-                  size_hint=(None,None), size=(dp(250),dp(120))).open()
+            self.show_error("Önce konumunuzu ayarlayın", 250)
             return
 
         addr = self.ids.dest_input.text.strip()
         if not addr:
-            Popup(title="Hata", content=Label(text="Hedef adres girin"), 
-                  size_hint=(None,None), size=(dp(250),dp(120))).open()
+            self.show_error("Hedef adres girin", 250)
             return
 
-        # Nominatim ile adres arama (daha spesifik)
-        search_params = {
-            "q": f"{addr}, Lefkoşa, Kuzey Kıbrıs",
-            "format": "json",
-            "limit": 5,
-            "countrycodes": "cy",
-            "bounded": 1,
-            "viewbox": "32.8,35.0,34.0,35.4"  # Kıbrıs sınırları
-        }
-        
+        search_id = self._new_search()
+        o = self.origin_marker
+        self.loading_status = "Adres aranıyor..."
+        threading.Thread(
+            target=self._search_worker,
+            args=(search_id, addr, (o.lat, o.lon)),
+            daemon=True
+        ).start()
+
+    def _new_search(self):
+        """Eski aramaları geçersiz say, başlamamış işlerini iptal et ve yeni arama numarasını döndür"""
+        with self.futures_lock:
+            self.search_id += 1
+            stale, self.pending_futures = self.pending_futures, {}
+        for futures in stale.values():
+            for future in futures:
+                future.cancel()
+        return self.search_id
+
+    def shutdown(self):
+        """Uygulama kapanırken aramaları durdur ve iş havuzunu kapat"""
+        self._new_search()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _is_current(self, search_id):
+        return search_id == self.search_id
+
+    def _post(self, search_id, callback, *args):
+        """Sonucu ana iş parçacığına aktar, eski aramaların sonuçlarını yok say"""
+        def apply(dt):
+            if self._is_current(search_id):
+                callback(*args)
+        Clock.schedule_once(apply)
+
+    def _submit(self, search_id, fn, *args, **kwargs):
+        with self.futures_lock:
+            if not self._is_current(search_id):
+                # Geçersiz arama (ya da kapanan havuz) için iş başlatılmaz, iptal edilmiş sonuç döner
+                future = Future()
+                future.cancel()
+                return future
+            future = self.executor.submit(fn, *args, **kwargs)
+            self.pending_futures.setdefault(search_id, []).append(future)
+        return future
+
+    def _search_worker(self, search_id, addr, origin):
+        """Arka planda adres arama, lamba verisi ve rota hesaplama akışı"""
         try:
-            geo = requests.get(NOMINATIM_URL, params=search_params, 
-                             headers={"User-Agent": "SafetyMapApp/1.0"}, timeout=10).json()
-            
-            if not geo:
-                # Alternatif arama
-                search_params["q"] = f"{addr}, Cyprus"
-                geo = requests.get(NOMINATIM_URL, params=search_params, 
-                                 headers={"User-Agent": "SafetyMapApp/1.0"}, timeout=10).json()
-            
-            if not geo:
-                Popup(title="Hata", content=Label(text="Adres bulunamadı. Lütfen daha spesifik bir adres girin."), 
-                      size_hint=(None,None), size=(dp(300),dp(120))).open()
-                return
+            self._run_search(search_id, addr, origin)
+        finally:
+            with self.futures_lock:
+                self.pending_futures.pop(search_id, None)
 
+    def _run_search(self, search_id, addr, origin):
+        try:
+            geo = self.geocode(addr)
         except Exception as e:
             print(f"Adres arama hatası: {e}")
-            Popup(title="Hata", content=Label(text="Adres arama sırasında hata oluştu"), 
-                  size_hint=(None,None), size=(dp(300),dp(120))).open()
+            self._post(search_id, self._search_failed, "Adres arama sırasında hata oluştu")
+            return
+
+        if not self._is_current(search_id):
+            return
+        if not geo:
+            self._post(search_id, self._search_failed, "Adres bulunamadı. Lütfen daha spesifik bir adres girin.")
             return
 
         # En iyi sonucu seç
         best_result = geo[0]
         lat2, lon2 = float(best_result["lat"]), float(best_result["lon"])
-        
-        # Hedef marker'ı ekle
-        if getattr(self, "dest_marker", None):
-            mv.remove_widget(self.dest_marker)
-        self.dest_marker = MapMarker(lat=lat2, lon=lon2, source="assets/images/locationred_on.png")
-        mv.add_widget(self.dest_marker)
-        mv.center_on(lat2, lon2)
-        self.dest_text = f"{lat2:.6f}, {lon2:.6f}"
+        self._post(search_id, self._show_destination, lat2, lon2)
+
+        # Sokak lambası verileri ve OSRM rotaları eşzamanlı yüklenir
+        lat_min = min(origin[0], lat2) - 0.01
+        lat_max = max(origin[0], lat2) + 0.01
+        lon_min = min(origin[1], lon2) - 0.01
+        lon_max = max(origin[1], lon2) + 0.01
 
-        # Sokak lambası verilerini yükle
-        o = self.origin_marker
-        lat_min = min(o.lat, lat2) - 0.01
-        lat_max = max(o.lat, lat2) + 0.01
-        lon_min = min(o.lon, lon2) - 0.01
-        lon_max = max(o.lon, lon2) + 0.01
-        
-        self.loading_status = "Sokak lambası verileri yükleniyor..."
         print("Sokak lambası verileri yükleniyor...")
-        if not self.lamp_manager.load_street_lamps_for_area(lat_min, lat_max, lon_min, lon_max):
-            print("Sokak lambası verileri yüklenemedi, varsayılan rota gösterilecek")
-            self.loading_status = "Varsayılan rota hesaplanıyor..."
-        else:
-            self.loading_status = "Güvenli rota hesaplanıyor..."
+        lamp_future = self._submit(
+            search_id, self.lamp_manager.load_street_lamps_for_area, lat_min, lat_max, lon_min, lon_max,
+            is_current=lambda: self._is_current(search_id)
+        )
+
+        # Aynı başlangıç/varış için daha önce hesaplanmış rotalar OSRM'e gitmeden kullanılır
+        route_key = self.route_cache.key_for(origin, (lat2, lon2))
+        cached = self.route_cache.get(route_key)
+        if cached is None:
+            route_future = self._submit(search_id, self.fetch_routes, origin, (lat2, lon2))
+            try:
+                res = route_future.result()
+            except Exception as e:
+                print(f"Rota hesaplama hatası: {e}")
+                self._post(search_id, self._search_failed, "Rota hesaplama sırasında hata oluştu")
+                return
 
-        # OSRM ile rota hesapla
-        url = OSRM_URL.format(lon1=o.lon, lat1=o.lat, lon2=lon2, lat2=lat2)
-        try:
-            res = requests.get(url, params={
-                "alternatives": "true",
-                "overview": "full", 
-                "geometries": "geojson",
-                "annotations": "true"
-            }, timeout=15).json()
-            
             if res.get("code") != "Ok":
-                Popup(title="Hata", content=Label(text="Rota hesaplanamadı"), 
-                      size_hint=(None,None), size=(dp(250),dp(120))).open()
+                self._post(search_id, self._search_failed, "Rota hesaplanamadı", 250)
                 return
 
+            routes = [{
+                # Koordinatlar (lat, lon) sütunlu dizi olarak tutulur
+                "coords": np.ascontiguousarray(
+                    np.asarray(route["geometry"]["coordinates"], dtype=float).reshape(-1, 2)[:, ::-1]),
+                "duration": route["legs"][0]["duration"],
+                "distance": route["legs"][0]["distance"],
+            } for route in res["routes"]]
+        else:
+            print("Rota önbellekten alındı")
+            routes = cached["routes"]
+
+        try:
+            lamps_loaded = lamp_future.result()
         except Exception as e:
-            print(f"Rota hesaplama hatası: {e}")
-            Popup(title="Hata", content=Label(text="Rota hesaplama sırasında hata oluştu"), 
-                  size_hint=(None,None), size=(dp(300),dp(120))).open()
+            print(f"Sokak lambası veri çekme hatası: {e}")
+            lamps_loaded = False
+
+        if not self._is_current(search_id):
             return
+        if not lamps_loaded:
+            print("Sokak lambası verileri yüklenemedi, varsayılan rota gösterilecek")
+            self._post(search_id, self._set_status, "Varsayılan rota hesaplanıyor...")
+        else:
+            self._post(search_id, self._set_status, "Güvenli rota hesaplanıyor...")
 
-        # En güvenli rotayı seç
-        best_route = None
-        best_safety_score = -1
-        
-        for route in res["routes"]:
-            coords = [(pt[1], pt[0]) for pt in route["geometry"]["coordinates"]]
-            safety_scores = self.calculate_route_safety(coords)
-            total_safety = sum(safety_scores)
-            
-            if total_safety > best_safety_score:
-                best_safety_score = total_safety
-                best_route = route
+        lamp_version = self.lamp_manager.data_version if lamps_loaded else None
+        if cached is not None and (lamp_version is None or cached["lamp_version"] == lamp_version):
+            # Lamba verisi yüklenemediyse önbellekteki (güncel veriyle hesaplanmış) skorlar kullanılır
+            route_scores, totals = cached["scores"], cached["totals"]
+        else:
+            # En güvenli rotayı seç (tüm alternatifler tek geçişte skorlanır)
+            route_scores, totals = self.calculate_routes_safety([r["coords"] for r in routes])
+            # Eski ya da boş lamba verisiyle hesaplanan skorlar önbelleğe yazılmaz
+            if lamp_version is not None:
+                self.route_cache.put(route_key, {
+                    "routes": routes,
+                    "scores": route_scores,
+                    "totals": totals,
+                    "lamp_version": lamp_version,
+                })
+
+        best_idx = int(np.argmax(totals)) if len(totals) else 0
+        self._post(search_id, self._show_route, routes[best_idx], route_scores[best_idx])
+
+    def geocode(self, addr):
+        """Nominatim ile adres arama (önce Lefkoşa, sonra tüm Kıbrıs), önce yerel önbelleğe bakılır"""
+        cached = self.geocode_cache.get(addr)
+        if cached:
+            lat, lon, display_name = cached
+            print(f"Adres önbellekten bulundu: {display_name} {self.geocode_cache.stats()}")
+            return [{"lat": lat, "lon": lon, "display_name": display_name}]
+
+        search_params = {
+            "q": f"{addr}, Lefkoşa, Kuzey Kıbrıs",
+            "format": "json",
+            "limit": 5,
+            "countrycodes": "cy",
+            "bounded": 1,
+            "viewbox": "32.8,35.0,34.0,35.4"  # Kıbrıs sınırları
+        }
         
-        if not best_route:
-            best_route = res["routes"][0]  # Varsayılan rota
+        geo = requests.get(NOMINATIM_URL, params=search_params, 
+                           headers={"User-Agent": "SafetyMapApp/1.0"}, timeout=10).json()
         
-        coords = [(pt[1], pt[0]) for pt in best_route["geometry"]["coordinates"]]
-        safety_scores = self.calculate_route_safety(coords)
+        if not geo:
+            # Alternatif arama
+            search_params["q"] = f"{addr}, Cyprus"
+            geo = requests.get(NOMINATIM_URL, params=search_params, 
+                               headers={"User-Agent": "SafetyMapApp/1.0"}, timeout=10).json()
+
+        if geo:
+            best = geo[0]
+            self.geocode_cache.put(addr, float(best["lat"]), float(best["lon"]), best.get("display_name", ""))
+        return geo
+
+    def fetch_routes(self, origin, dest):
+        """OSRM ile alternatif rotaları getir"""
+        url = OSRM_URL.format(lon1=origin[1], lat1=origin[0], lon2=dest[1], lat2=dest[0])
+        return requests.get(url, params={
+            "alternatives": "true",
+            "overview": "full", 
+            "geometries": "geojson",
+            "annotations": "true"
+        }, timeout=15).json()
+
+    def _set_status(self, text):
+        self.loading_status = text
+
+    def _search_failed(self, text, width=300):
+        self.loading_status = ""
+        self.show_error(text, width)
+
+    def _show_destination(self, lat2, lon2):
+        mv: MapView = self.ids.map2
+        # Hedef marker'ı ekle
+        if getattr(self, "dest_marker", None):
+            mv.remove_widget(self.dest_marker)
+        self.dest_marker = MapMarker(lat=lat2, lon=lon2, source="assets/images/locationred_on.png")
+        mv.add_widget(self.dest_marker)
+        mv.center_on(lat2, lon2)
+        self.dest_text = f"{lat2:.6f}, {lon2:.6f}"
+        self.loading_status = "Sokak lambası verileri yükleniyor..."
 
+    def _show_route(self, best_route, safety_scores):
+        mv: MapView = self.ids.map2
         # Polyline ekle
         if getattr(self, "polyline_layer", None):
             mv.remove_widget(self.polyline_layer)
-        self.polyline_layer = SafePolylineLayer(coords, safety_scores)
+        self.polyline_layer = SafePolylineLayer(best_route["coords"], safety_scores)
         mv.add_widget(self.polyline_layer)
 
         # Rota bilgisini güncelle
-        leg = best_route["legs"][0]
-        dur = round(leg["duration"]/60)
-        dist = round(leg["distance"]/1000, 2)
-        avg_safety = sum(safety_scores) / len(safety_scores) if safety_scores else 0
+        dur = round(best_route["duration"]/60)
+        dist = round(best_route["distance"]/1000, 2)
+        avg_safety = float(np.mean(safety_scores)) if len(safety_scores) else 0
         self.route_info = f"{dur} dk · {dist} km "
         self.loading_status = ""  # Loading durumunu temizle
 
@@ -0,0 +1,96 @@
+import math
+from collections import namedtuple
+
+# Bir kümenin özeti: merkez, konum sayısı, toplam puan sayısı ve ortalama puan
+Cluster = namedtuple("Cluster", "lat lon locations ratings avg")
+
+
+def world_xy(lat, lon, zoom, tile_size=256):
+    """Web Mercator dünya piksel koordinatları"""
+    size = tile_size * (2 ** zoom)
+    lat = max(min(lat, 85.0511), -85.0511)
+    phi = math.radians(lat)
+    x = (lon + 180.0) / 360.0 * size
+    y = (1.0 - math.log(math.tan(phi) + 1.0 / math.cos(phi)) / math.pi) / 2.0 * size
+    return x, y
+
+
+class ScoreClusterIndex:
+    """Puanlanmış konumları her yakınlaştırma seviyesinde ekran hücrelerine göre kümeler"""
+
+    def __init__(self, cell_px=60):
+        self.cell_px = cell_px
+        self.points = {}   # (lat, lon) -> (avg, count, konum sayısı)
+        self._zooms = {}   # zoom -> {hücre: [nokta anahtarları, puan sayısı, puan toplamı, lat toplamı, lon toplamı, konum sayısı]}
+
+    def cell_of(self, lat, lon, zoom):
+        x, y = world_xy(lat, lon, zoom)
+        return (int(x // self.cell_px), int(y // self.cell_px))
+
+    def clear(self):
+        self.points.clear()
+        self._zooms.clear()
+
+    def set_point(self, lat, lon, avg, count=1, locations=1):
+        """Noktayı ekle ya da güncelle; önceden hesaplanmış seviyeler artımlı güncellenir.
+
+        Veritabanında önceden özetlenmiş gruplar için locations > 1 olur.
+        """
+        key = (lat, lon)
+        old = self.points.get(key)
+        self.points[key] = (avg, count, locations)
+        for zoom, cells in self._zooms.items():
+            cell = self.cell_of(lat, lon, zoom)
+            if old is not None:
+                self._apply(cells, cell, lat, lon, *old, -1)
+            self._apply(cells, cell, lat, lon, avg, count, locations, 1)
+
+    def remove_point(self, lat, lon):
+        old = self.points.pop((lat, lon), None)
+        if old is None:
+            return
+        for zoom, cells in self._zooms.items():
+            self._apply(cells, self.cell_of(lat, lon, zoom), lat, lon, *old, -1)
+
+    @staticmethod
+    def _apply(cells, cell, lat, lon, avg, count, locations, sign):
+        agg = cells.setdefault(cell, [set(), 0, 0.0, 0.0, 0.0, 0])
+        if sign > 0:
+            agg[0].add((lat, lon))
+        else:
+            agg[0].discard((lat, lon))
+        agg[1] += sign * count
+        agg[2] += sign * avg * count
+        agg[3] += sign * lat
+        agg[4] += sign * lon
+        agg[5] += sign * locations
+        if not agg[0]:
+            del cells[cell]
+
+    def _cells(self, zoom):
+        cells = self._zooms.get(zoom)
+        if cells is None:
+            cells = {}
+            for (lat, lon), (avg, count, locations) in self.points.items():
+                self._apply(cells, self.cell_of(lat, lon, zoom), lat, lon, avg, count, locations, 1)
+            self._zooms[zoom] = cells
+        return cells
+
+    def clusters_in_bbox(self, zoom, lat_min, lon_min, lat_max, lon_max, margin=1):
+        """Görünür alandaki hücrelerin kümelerini {hücre: Cluster} olarak döndür"""
+        x0, y0 = world_xy(lat_max, lon_min, zoom)
+        x1, y1 = world_xy(lat_min, lon_max, zoom)
+        i0, i1 = int(x0 // self.cell_px) - margin, int(x1 // self.cell_px) + margin
+        j0, j1 = int(y0 // self.cell_px) - margin, int(y1 // self.cell_px) + margin
+
+        result = {}
+        for cell, (keys, ratings, total, lat_sum, lon_sum, locations) in self._cells(zoom).items():
+            if not (i0 <= cell[0] <= i1 and j0 <= cell[1] <= j1):
+                continue
+            if len(keys) == 1:
+                # Tek konumlu kümede koordinatlar birebir korunur
+                lat, lon = next(iter(keys))
+            else:
+                lat, lon = lat_sum / len(keys), lon_sum / len(keys)
+            result[cell] = Cluster(lat, lon, locations, ratings, total / ratings if ratings else 0)
+        return result
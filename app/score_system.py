@@ -1,18 +1,21 @@
 import sqlite3
 from kivy.app import App
 from kivy.uix.screenmanager import Screen
-from kivy_garden.mapview import MapMarkerPopup, MapSource
+from kivy_garden.mapview import MapMarker, MapMarkerPopup, MapSource
 from kivy.uix.popup import Popup
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.core.window import Window
 from kivy.clock import Clock
+from kivy.properties import StringProperty
 from functools import partial
 from kivy.uix.anchorlayout import AnchorLayout
 from kivy.graphics import Color, Rectangle
 
-from database import Database
+from database import Database, group_factor, group_key, location_cell, cell_center
+from score_clusters import ScoreClusterIndex
+from score_writer import ScoreWriteQueue
 
 # Google Maps karo kaynağı
 google_maps = MapSource(
@@ -31,9 +34,23 @@ class ScoreSystemScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.db = Database()
+        # Puanlar gruplanarak arka planda yazılır
+        self.score_writer = ScoreWriteQueue(self.db, on_flush=self._on_scores_flushed)
         self.selected_rating = 0
         self.star_buttons = []
-        self.existing_markers = []  # YENİ: Mevcut marker'ları takip et
+        # Kümeleme indeksi ve ekranda gösterilen marker'lar (hücre -> marker)
+        self.cluster_index = ScoreClusterIndex()
+        self.cluster_markers = {}
+        self.marker_zoom = None
+        # Haritaya yansıtılmış en son security_scores id'si
+        self.score_high_water = 0
+        # Son yüklenen alan (görünür alan + pay) ve yakınlaştırma seviyesi
+        self.loaded_bbox = None
+        self.loaded_zoom = None
+        # Yüklü gruplar: grup anahtarı -> indeksteki nokta (lat, lon)
+        self.loaded_groups = {}
+        self._scores_trigger = Clock.create_trigger(self.load_viewport_scores, 0.3)
+        self._refresh_trigger = Clock.create_trigger(self.refresh_clusters)
 
     def on_pre_enter(self):
         map_widget = self.ids.get("map")
@@ -45,8 +62,8 @@ class ScoreSystemScreen(Screen):
             map_widget.lon = CYPRUS_LON
             map_widget.zoom = DEFAULT_ZOOM
 
-            # YENİ: Sayfa açıldığında tüm mevcut puanları göster
-            self.load_all_existing_markers()
+            # Sayfa açıldığında sadece son ziyaretten beri değişen konumları uygula
+            self.sync_markers()
 
             # Uzun basma (long-press) algılaması için olayları bağla
             map_widget.unbind(
@@ -60,24 +77,142 @@ class ScoreSystemScreen(Screen):
                 on_touch_up=self._on_touch_up
             )
 
-    def load_all_existing_markers(self):  # YENİ FONKSİYON
-        """Veritabanındaki tüm puanları haritada göster"""
-        map_widget = self.ids.get("map")
-        if not map_widget:
+            # Kaydırma/yakınlaştırmada görünür kümeleri güncelle
+            map_widget.unbind(on_map_relocated=self._on_map_relocated)
+            map_widget.bind(on_map_relocated=self._on_map_relocated)
+
+    def reload_markers(self):
+        """Tüm marker durumunu sıfırla ve görünür alanı veritabanından baştan yükle.
+
+        Tek sıfırlama yolu: sync_markers ilk ziyarette ve artımlı güncelleme yapılamadığında
+        (ör. import-scores ile toplu içe aktarma sonrası) bunu çağırır.
+        """
+        self.clear_cluster_markers()
+        self.cluster_index.clear()
+        self.loaded_bbox = None
+        self.loaded_groups = {}
+        self.score_high_water = self.db.get_max_score_id()
+        self.load_viewport_scores(force=True)
+
+    def sync_markers(self):
+        """Son ziyaretten beri eklenen puanların düştüğü grupları güncelle.
+
+        Değişiklik yoksa tek bir MAX(id) sorgusu yapılır; varsa yalnızca yüklü alandaki
+        etkilenen gruplar yeniden sorgulanır ve indekste yerlerine konur. Henüz alan
+        yüklenmediyse ya da çok fazla hücre değiştiyse alan baştan yüklenir.
+        """
+        if self.loaded_bbox is None:
+            self.reload_markers()
+            return
+        cells, self.score_high_water = self.db.get_changed_cells(self.score_high_water, *self.loaded_bbox)
+        if cells is None:
+            self.reload_markers()
+            return
+        if cells:
+            self._apply_changed_cells(cells)
+        self.load_viewport_scores()
+
+    def _apply_changed_cells(self, cells):
+        bbox = self.loaded_bbox
+        factor = group_factor(self.loaded_zoom)
+        # Bekleyen puanı olan hücreler bellekteki özetle gösteriliyor, yazılınca güncellenir
+        pending = self.score_writer.pending_aggregates() if factor == 1 else {}
+        groups = set()
+        for cell in cells:
+            lat, lon = cell_center(*cell)
+            if bbox[0] <= lat <= bbox[1] and bbox[2] <= lon <= bbox[3] and (lat, lon) not in pending:
+                groups.add(group_key(*cell, factor))
+        if not groups:
+            return
+
+        rows = self.db.get_score_groups(groups, self.loaded_zoom)
+        for group in groups:
+            old = self.loaded_groups.pop(group, None)
+            if old is not None:
+                self.cluster_index.remove_point(*old)
+            row = rows.get(group)
+            if row is not None:
+                lat, lon, avg_score, rating_count, locations = row
+                self.cluster_index.set_point(lat, lon, avg_score, rating_count, locations)
+                self.loaded_groups[group] = (lat, lon)
+        self.refresh_clusters()
+        print(f"✅ {len(groups)} konum grubu güncellendi")
+
+    def load_viewport_scores(self, *args, force=False):
+        """Sadece görünür alandaki (ve çevresindeki) puanları yakınlaştırmaya uygun özetle getir"""
+        map_w = self.ids.get("map")
+        if not map_w:
+            return
+
+        zoom = int(map_w.zoom)
+        lat_min, lon_min, lat_max, lon_max = map_w.get_bbox()
+        loaded = self.loaded_bbox
+        if (not force and loaded and zoom == self.loaded_zoom
+                and lat_min >= loaded[0] and lat_max <= loaded[1]
+                and lon_min >= loaded[2] and lon_max <= loaded[3]):
+            return
+
+        # Kaydırmada hemen yeniden sorgulamamak için her yönde yarım ekran pay
+        dlat = (lat_max - lat_min) / 2
+        dlon = (lon_max - lon_min) / 2
+        bbox = (lat_min - dlat, lat_max + dlat, lon_min - dlon, lon_max + dlon)
+        rows = self.db.get_scores_in_bbox(*bbox, zoom)
+
+        factor = group_factor(zoom)
+        self.cluster_index.clear()
+        self.loaded_groups = {}
+        for lat, lon, avg_score, rating_count, locations in rows:
+            self.cluster_index.set_point(lat, lon, avg_score, rating_count, locations)
+            # Grup ağırlık merkezi kendi grubunun hücrelerinden birine yuvarlanır
+            self.loaded_groups[group_key(*location_cell(lat, lon), factor)] = (lat, lon)
+        if factor == 1:
+            # Henüz yazılmamış puanlar hücre düzeyinde bellekteki özetten gösterilir
+            for (lat, lon), (rating_count, avg_score) in self.score_writer.pending_aggregates().items():
+                if bbox[0] <= lat <= bbox[1] and bbox[2] <= lon <= bbox[3]:
+                    self.cluster_index.set_point(lat, lon, avg_score, rating_count)
+        self.loaded_bbox = bbox
+        self.loaded_zoom = zoom
+
+        self.refresh_clusters()
+        print(f"✅ {len(rows)} konum grubu yüklendi, {len(self.cluster_markers)} marker gösteriliyor")
+
+    def clear_cluster_markers(self):
+        map_w = self.ids.get("map")
+        for marker in self.cluster_markers.values():
+            if map_w:
+                map_w.remove_widget(marker)
+        self.cluster_markers.clear()
+
+    def _on_map_relocated(self, *args):
+        self._refresh_trigger()
+        # Veritabanı sorgusu kaydırma/yakınlaştırma durulunca yapılır
+        self._scores_trigger.cancel()
+        self._scores_trigger()
+
+    def refresh_clusters(self, *args):
+        """Sadece görünür alandaki kümeler için marker oluştur, değişmeyenlere dokunma"""
+        map_w = self.ids.get("map")
+        if not map_w:
             return
-        
-        # Önceki marker'ları temizle
-        for marker in self.existing_markers:
-            map_widget.remove_widget(marker)
-        self.existing_markers.clear()
-        
-        # Tüm konumların ortalama puanlarını al
-        all_scores = self.db.get_scores()
-        
-        for lat, lon, avg_score in all_scores:
-            self.add_or_update_marker(lat, lon, avg_score, save_to_list=True)
-        
-        print(f"✅ {len(all_scores)} konum için marker'lar yüklendi")
+
+        zoom = int(map_w.zoom)
+        if zoom != self.marker_zoom:
+            # Yakınlaştırma değişince hücreler de değişir
+            self.clear_cluster_markers()
+            self.marker_zoom = zoom
+
+        lat_min, lon_min, lat_max, lon_max = map_w.get_bbox()
+        visible = self.cluster_index.clusters_in_bbox(zoom, lat_min, lon_min, lat_max, lon_max)
+
+        for cell in list(self.cluster_markers):
+            marker = self.cluster_markers[cell]
+            if visible.get(cell) != marker.cluster:
+                map_w.remove_widget(marker)
+                del self.cluster_markers[cell]
+
+        for cell, cluster in visible.items():
+            if cell not in self.cluster_markers:
+                self.cluster_markers[cell] = self.add_cluster_marker(cluster)
 
     def _on_touch_down(self, instance, touch):
         if instance.collide_point(*touch.pos):
@@ -226,34 +361,61 @@ class ScoreSystemScreen(Screen):
         if user_info:
             user_id = user_info['id']
             score = self.selected_rating or 1
-            self.db.save_score(user_id, lat, lon, score)
-            avg = self.db.get_average_score(lat, lon)
+            # Puan kuyruğa alınır; marker hücre merkezinde bellekteki özetle hemen güncellenir
+            (lat, lon), (total_ratings, avg, _, _) = self.score_writer.add(user_id, lat, lon, score)
             
             # YENİ: Marker'ı güncelle ve listeyi yenile
-            self.refresh_marker_at_location(lat, lon, avg)
+            self.refresh_marker_at_location(lat, lon, avg, total_ratings)
             
             print(f"{score} points by user {user_id}")
         else:
             print("No active users found!!")
 
-    def refresh_marker_at_location(self, lat, lon, avg_score): 
+    def refresh_marker_at_location(self, lat, lon, avg_score, rating_count=1): 
         """Update marker in specific location"""
+        # Hücre düzeyinde gösterimde nokta doğrudan güncellenir; özetlenmiş
+        # gruplar puanlar yazılınca (_on_scores_flushed) yeniden sorgulanır
+        map_w = self.ids.get("map")
+        if map_w and group_factor(int(map_w.zoom)) == 1:
+            self.cluster_index.set_point(lat, lon, avg_score, rating_count)
+            self.refresh_clusters()
+
+    def _on_scores_flushed(self, count):
+        # Arka plan yazıcısından çağrılır; harita ana iş parçacığında güncellenir
+        Clock.schedule_once(lambda dt: self.sync_markers())
+
+    def add_cluster_marker(self, cluster):
+        if cluster.locations == 1:
+            marker = self.add_or_update_marker(cluster.lat, cluster.lon, cluster.avg)
+        else:
+            map_w = self.ids.get("map")
+            marker = ClusterMarker(lat=cluster.lat, lon=cluster.lon)
+            marker.source = self.marker_source(cluster.avg)
+            marker.text = f"{cluster.locations}\n{cluster.avg:.1f}"
+            marker.bind(on_release=lambda *a: self.zoom_to_cluster(cluster))
+            map_w.add_widget(marker)
+        marker.cluster = cluster
+        return marker
+
+    def zoom_to_cluster(self, cluster):
+        """Kümeye dokununca üzerine yakınlaş"""
         map_w = self.ids.get("map")
         if not map_w:
             return
-        
-        # Aynı konumdaki eski marker'ı bul ve kaldır
-        tolerance = 0.0001  # Koordinat toleransı
-        for marker in self.existing_markers[:]:  # Liste kopyası ile iterate et
-            if (abs(marker.lat - lat) < tolerance and abs(marker.lon - lon) < tolerance):
-                map_w.remove_widget(marker)
-                self.existing_markers.remove(marker)
-                break
-        
-        # Yeni marker ekle
-        self.add_or_update_marker(lat, lon, avg_score, save_to_list=True)
+        map_w.zoom = min(map_w.zoom + 2, 19)
+        map_w.center_on(cluster.lat, cluster.lon)
+
+    @staticmethod
+    def marker_source(avg_score):
+        # DOĞRU MARKER RESİMLERİ:
+        if avg_score >= 4:
+            return "assets/images/location_on.png"      #YEŞİL - SAFE (4-5 puan)
+        elif avg_score <= 2:
+            return "assets/images/locationred_on.png"   #KIRMIZI - DANGER (1-2 puan)
+        else:
+            return "assets/images/location.png"         #TURUNCU - NORMAL (3 puan)
 
-    def add_or_update_marker(self, lat, lon, avg_score, save_to_list=False):
+    def add_or_update_marker(self, lat, lon, avg_score):
         map_w = self.ids.get("map")
         if not map_w:
             return
@@ -263,29 +425,18 @@ class ScoreSystemScreen(Screen):
         marker.size_hint = (None, None)
         marker.allow_stretch = True
         marker.keep_ratio = True
-        
-        # DOĞRU MARKER RESİMLERİ:
-        if avg_score >= 4:
-            marker.source = "assets/images/location_on.png"      #YEŞİL - SAFE (4-5 puan)
-        elif avg_score <= 2:
-            marker.source = "assets/images/locationred_on.png"   #KIRMIZI - DANGER (1-2 puan)
-        else:
-            marker.source = "assets/images/location.png"         #TURUNCU - NORMAL (3 puan)
+        marker.source = self.marker_source(avg_score)
 
         marker.bind(on_release=lambda *a: self.show_marker_info(lat, lon))
         map_w.add_widget(marker)
-        
-        if save_to_list:
-            self.existing_markers.append(marker)
+        return marker
 
     def show_marker_info(self, lat, lon):
-        details = self.db.get_location_details(lat, lon)
-        if details:
+        # Özet ve son yorumlar tek sorguda gelir
+        details, individual_scores = self.get_location_user_details(lat, lon)
+        if details[0]:
             total_ratings, avg_score, min_score, max_score = details
             
-            # YENİ: Bu konuma puan veren kullanıcıların bilgilerini al
-            individual_scores = self.get_location_user_details(lat, lon)
-            
             box = BoxLayout(orientation='vertical', padding=20, spacing=15)
             
             # Genel bilgi
@@ -300,7 +451,7 @@ class ScoreSystemScreen(Screen):
             # YENİ: Kullanıcı detayları (son 3 puan)
             if individual_scores:
                 user_info_text = "\n🔍 Recent Reviews:\n"
-                for score_info in individual_scores[:3]:  # Son 3 puan
+                for score_info in individual_scores:
                     user_info_text += f"• User {score_info[0]}: {score_info[1]}⭐\n"
                 
                 user_lbl = Label(
@@ -323,20 +474,34 @@ class ScoreSystemScreen(Screen):
             box.add_widget(btn)
             pop.open()
 
-    def get_location_user_details(self, lat, lon):  # YENİ FONKSİYON
-        """Bring the details of the users who rated this location"""
+    def get_location_user_details(self, lat, lon, limit=3):  # YENİ FONKSİYON
+        """Bring the location summary and the latest reviews of the users who rated it"""
         try:
-            self.db.cursor.execute("""
-                SELECT u.id, s.score, s.created_at
-                FROM security_scores s
-                JOIN users u ON s.user_id = u.id
-                WHERE s.lat = ? AND s.lon = ?
-                ORDER BY s.created_at DESC
-            """, (lat, lon))
-            return self.db.cursor.fetchall()
+            details, reviews = self.db.get_location_summary(lat, lon, limit)
         except Exception as e:
             print(f"Error retrieveng user details: {e}")
-            return []
+            details, reviews = self.db.get_location_details(lat, lon), []
+        # Henüz yazılmamış puanlar bellekteki özette
+        cached = self.score_writer.cached_details(lat, lon)
+        return (cached or details), reviews
 
 class LocationMarker(MapMarkerPopup):
     pass
+
+class ClusterMarker(MapMarker):
+    """Birden fazla konumu temsil eden marker: konum sayısı ve ortalama puanı gösterir"""
+    text = StringProperty("")
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.size = (34, 34)
+        self.size_hint = (None, None)
+        self.allow_stretch = True
+        self.label = Label(text=self.text, font_size='10sp', bold=True, halign='center')
+        self.add_widget(self.label)
+        self.bind(pos=self._sync_label, size=self._sync_label, text=self._sync_label)
+
+    def _sync_label(self, *args):
+        self.label.text = self.text
+        self.label.pos = self.pos
+        self.label.size = self.size
@@ -0,0 +1,145 @@
+import threading
+import time
+from database import location_cell, cell_center, close_connection
+
+# Bekleyen puanların en geç yazılma süresi (saniye) ve tek işlemdeki en fazla puan
+FLUSH_INTERVAL = 1.0
+MAX_BATCH = 32
+
+
+class ScoreWriteQueue:
+    """Puanları bellekte toplayıp arka planda tek işlemde yazan kuyruk.
+
+    Yazılmamış puanı olan hücrelerin özetleri bellekte tutulur; böylece marker
+    yenilemesi yazmayı beklemez. Hücrenin tüm puanları yazılınca özeti bellekten atılır.
+    """
+
+    def __init__(self, db, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH, on_flush=None):
+        self.db = db
+        # Başarılı her yazmadan sonra yazılan puan sayısıyla çağrılır (yazan iş parçacığında)
+        self.on_flush = on_flush
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._pending = []        # (user_id, lat, lon, score)
+        self._flushing = []       # yazılmakta olan grup
+        self._first_pending_at = None
+        self._aggregates = {}     # bekleyen hücre -> [puan sayısı, toplam, en düşük, en yüksek] ya da None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, user_id, lat, lon, score):
+        """Puanı kuyruğa ekle; hücre merkezini ve güncel (sayı, ortalama, en düşük, en yüksek) özeti döndür"""
+        cell = location_cell(lat, lon)
+        with self._cond:
+            agg = self._cell_aggregate(cell)
+            if agg is None:
+                agg = self._aggregates[cell] = [1, score, score, score]
+            else:
+                agg[0] += 1
+                agg[1] += score
+                agg[2] = min(agg[2], score)
+                agg[3] = max(agg[3], score)
+            self._pending.append((user_id, lat, lon, score))
+            if self._first_pending_at is None:
+                self._first_pending_at = time.monotonic()
+            self._cond.notify()
+            details = self._details(agg)
+        return cell_center(*cell), details
+
+    def cached_details(self, lat, lon):
+        """Hücrenin yazılmamış puanı varsa bekleyenler dahil özetini, yoksa None döndür (veritabanına gitmez)"""
+        with self._cond:
+            agg = self._aggregates.get(location_cell(lat, lon))
+            return self._details(agg) if agg else None
+
+    def pending_aggregates(self):
+        """Henüz yazılmamış puanı olan hücreler: {(lat, lon): (puan sayısı, ortalama)}"""
+        with self._cond:
+            cells = {location_cell(lat, lon) for _, lat, lon, _ in self._pending + self._flushing}
+            result = {}
+            for cell in cells:
+                count, total, _, _ = self._aggregates[cell]
+                result[cell_center(*cell)] = (count, total / count)
+            return result
+
+    def _cell_aggregate(self, cell):
+        # İlk erişimde veritabanındaki özet okunur; hücre yazılana kadar bellekteki kopya günceldir
+        if cell not in self._aggregates:
+            row = self.db.get_location_aggregate(*cell_center(*cell))
+            self._aggregates[cell] = list(row) if row else None
+        return self._aggregates[cell]
+
+    @staticmethod
+    def _details(agg):
+        if not agg:
+            return (0, None, None, None)
+        count, total, low, high = agg
+        return (count, total / count, low, high)
+
+    def flush(self, durable=False):
+        """Bekleyen puanları tek işlemde yaz; durable ise WAL diske eşitlenir.
+
+        Yazılan puan sayısını, hata olursa None döndürür (puanlar kuyrukta kalır).
+        """
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+                self._flushing = batch
+                self._first_pending_at = None
+            try:
+                if batch:
+                    self.db.save_scores(batch)
+                if durable:
+                    self.db.checkpoint()
+            except Exception as e:
+                print(f"❌ Puanlar kaydedilemedi, tekrar denenecek: {e}")
+                with self._cond:
+                    self._flushing = []
+                    self._pending[:0] = batch
+                    self._first_pending_at = time.monotonic()
+                return None
+            with self._cond:
+                self._flushing = []
+                # Tüm puanları yazılmış hücrelerin özeti artık veritabanında
+                pending = {location_cell(lat, lon) for _, lat, lon, _ in self._pending}
+                for _, lat, lon, _ in batch:
+                    cell = location_cell(lat, lon)
+                    if cell not in pending:
+                        self._aggregates.pop(cell, None)
+            if batch:
+                print(f"✅ {len(batch)} puan tek işlemde kaydedildi")
+                if self.on_flush:
+                    self.on_flush(len(batch))
+            return len(batch)
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    while not self._pending and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        break
+                    # İlk puandan itibaren en fazla flush_interval kadar ya da grup dolana kadar bekle
+                    while len(self._pending) < self.max_batch and not self._closed:
+                        remaining = self._first_pending_at + self.flush_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    if self._closed:
+                        break
+                if self.flush() is None:
+                    time.sleep(self.flush_interval)
+        finally:
+            close_connection(self.db.db_path)
+
+    def close(self):
+        """Arka plan yazıcısını durdur ve kalan puanları kalıcı olarak yaz"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush(durable=True)
@@ -1,69 +1,125 @@
-import sqlite3
 import uuid
+import threading
 from datetime import datetime
+from database import DB_PATH, get_connection, close_connection
+
+# Kapalı oturumların saklanma süresi (gün) ve en fazla tutulacak kapalı oturum sayısı
+SESSION_MAX_AGE_DAYS = 30
+SESSION_KEEP_INACTIVE = 50
+
+# Önbellekte henüz aktif kullanıcı sorgulanmadığını belirtir
+_UNSET = object()
 
 class SessionManager:
-    def __init__(self):
-        self.db_path = "users.db"
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        # Aktif kullanıcı önbelleği; oturum ya da profil değişince sıfırlanır
+        self._active_user = _UNSET
+        self._cache_generation = 0
+        self._cache_lock = threading.Lock()
         self.init_session_table()
+
+    @property
+    def conn(self):
+        """Çağıran iş parçacığının paylaşılan bağlantısı"""
+        return get_connection(self.db_path)
     
     def init_session_table(self):
-        """Oturum tablosunu oluştur"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Session tablosu ekle
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                session_token TEXT UNIQUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_active INTEGER DEFAULT 1,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Kullanıcı ve oturum tablolarını oluştur"""
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY,
+                    id_number TEXT,
+                    password TEXT,
+                    birth_year TEXT,
+                    phone_number TEXT
+                )
+            """)
+
+            # Session tablosu ekle
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS user_sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    session_token TEXT UNIQUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    is_active INTEGER DEFAULT 1,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            # Aktif oturum araması oturum sayısından bağımsız kalsın
+            self.conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_user_sessions_active
+                ON user_sessions (is_active, created_at)
+            ''')
         print("Session tablosu hazır")
+
+    def create_user(self, id_number, password, birth_year, phone_number):
+        """Yeni kullanıcıyı kaydet ve id'sini döndür, hata olursa None"""
+        try:
+            with self.conn:
+                cursor = self.conn.execute("""
+                    INSERT INTO users (id_number, password, birth_year, phone_number)
+                    VALUES (?, ?, ?, ?)
+                """, (id_number, password, birth_year, phone_number))
+            return cursor.lastrowid
+        except Exception as e:
+            print(f"Veritabanı hatası: {e}")
+            return None
+
+    def update_phone_number(self, user_id, phone_number):
+        """Kullanıcının telefon numarasını güncelle"""
+        with self.conn:
+            self.conn.execute("UPDATE users SET phone_number = ? WHERE id = ?",
+                              (phone_number, user_id))
+        self.invalidate_cache()
+
+    def invalidate_cache(self):
+        """Aktif kullanıcı önbelleğini temizle, sonraki okuma veritabanından yapılır"""
+        with self._cache_lock:
+            self._active_user = _UNSET
+            self._cache_generation += 1
     
     def create_session(self, user_id):
         """Yeni oturum oluştur"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Eski oturumları kapat
-        cursor.execute('UPDATE user_sessions SET is_active = 0 WHERE user_id = ?', (user_id,))
-        
         # Yeni session token oluştur
         session_token = str(uuid.uuid4())
-        
-        cursor.execute('''
-            INSERT INTO user_sessions (user_id, session_token)
-            VALUES (?, ?)
-        ''', (user_id, session_token))
-        
-        conn.commit()
-        conn.close()
+
+        with self.conn:
+            # Eski oturumları kapat
+            self.conn.execute('UPDATE user_sessions SET is_active = 0 WHERE user_id = ?', (user_id,))
+            self.conn.execute('''
+                INSERT INTO user_sessions (user_id, session_token)
+                VALUES (?, ?)
+            ''', (user_id, session_token))
+        self.invalidate_cache()
         return session_token
     
     def get_active_user(self):
-        """Aktif oturumu olan kullanıcıyı getir"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        """Aktif oturumu olan kullanıcıyı getir (önbellekten, yoksa veritabanından)"""
+        with self._cache_lock:
+            user = self._active_user
+            generation = self._cache_generation
+        if user is _UNSET:
+            user = self._load_active_user()
+            with self._cache_lock:
+                # Okuma sırasında önbellek geçersizlendiyse eski sonucu saklama
+                if generation == self._cache_generation:
+                    self._active_user = user
+        # Çağıranlar önbellekteki sözlüğü değiştiremesin
+        return dict(user) if user else None
+
+    def _load_active_user(self):
+        cursor = self.conn.execute('''
             SELECT u.id, u.id_number, u.password, u.birth_year, u.phone_number
             FROM users u
             JOIN user_sessions s ON u.id = s.user_id
             WHERE s.is_active = 1
-            ORDER BY s.created_at DESC
+            ORDER BY s.created_at DESC, s.id DESC
             LIMIT 1
         ''')
-        
         result = cursor.fetchone()
-        conn.close()
         
         if result:
             return {
@@ -81,11 +137,61 @@ class SessionManager:
     
     def logout_all_sessions(self):
         """Tüm oturumları kapat"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('UPDATE user_sessions SET is_active = 0')
-        
-        conn.commit()
-        conn.close()
+        with self.conn:
+            # Yalnızca açık oturumlar yeniden yazılır
+            self.conn.execute('UPDATE user_sessions SET is_active = 0 WHERE is_active = 1')
+        self.invalidate_cache()
         print(" Tüm oturumlar kapatıldı")
+
+    def prune_sessions(self, max_age_days=SESSION_MAX_AGE_DAYS, keep_inactive=SESSION_KEEP_INACTIVE):
+        """Eski kapalı oturumları sil ve boşalan sayfaları dosyadan geri kazan.
+
+        Süresi geçen ya da en yeni keep_inactive kaydın dışında kalan kapalı oturumlar
+        silinir; açık oturumlara dokunulmaz. {'rows': silinen satır, 'bytes': kazanılan bayt} döndürür.
+        """
+        conn = self.conn
+        size_before = self._database_size()
+        with conn:
+            cursor = conn.execute('''
+                DELETE FROM user_sessions
+                WHERE is_active = 0 AND (
+                    created_at < datetime('now', ?)
+                    OR id NOT IN (
+                        SELECT id FROM user_sessions
+                        WHERE is_active = 0
+                        ORDER BY created_at DESC, id DESC
+                        LIMIT ?
+                    )
+                )
+            ''', (f"-{int(max_age_days)} days", keep_inactive))
+            deleted = cursor.rowcount
+
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Artımlı moda geçiş tek seferlik tam VACUUM gerektirir
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        # Her adımda bir sayfa serbest bırakılır, bu yüzden tüm satırlar okunur
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+
+        reclaimed = max(size_before - self._database_size(), 0)
+        print(f"🧹 Oturum bakımı: {deleted} kayıt silindi, {reclaimed} bayt geri kazanıldı")
+        return {'rows': deleted, 'bytes': reclaimed}
+
+    def _database_size(self):
+        page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+    def start_maintenance(self, **kwargs):
+        """Oturum temizliğini arka planda çalıştır"""
+        def worker():
+            try:
+                self.prune_sessions(**kwargs)
+            except Exception as e:
+                print(f"⚠️ Oturum bakımı başarısız: {e}")
+            finally:
+                close_connection(self.db_path)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
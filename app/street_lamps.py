@@ -0,0 +1,173 @@
+import time
+import threading
+import numpy as np
+import requests
+
+from lamp_cache import LampTileCache, LAMP_TYPES, empty_lamps, lamp_type_code
+from lamp_index import LampGridIndex, count_near_points, haversine_distance
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+
+
+class StreetLampManager:
+    def __init__(self, overpass_url=OVERPASS_URL, tile_cache=None):
+        self.overpass_url = overpass_url
+        self.tile_cache = tile_cache or LampTileCache()
+        # Sütun tabanlı lamba verisi: koordinat dizileri ve küçük tamsayı tür kodları
+        self.lamp_lats, self.lamp_lons, self.lamp_types = empty_lamps()
+        self.lamp_index = LampGridIndex(self.lamp_lats, self.lamp_lons)
+        # Vektörel skorlama için enleme göre sıralı koordinat dizileri
+        self.sorted_lats = np.empty(0)
+        self.sorted_lons = np.empty(0)
+        self.loaded = False
+        # Yüklü karoların parmak izi; lamba verisi değişince rota skorları geçersizleşir
+        self.data_version = None
+        # Arka plan iş parçacıkları arasında veri değişimini korur
+        self.lock = threading.Lock()
+
+    @property
+    def street_lamps(self):
+        """Eski API uyumluluğu için lambaları sözlük listesi olarak döndür"""
+        with self.lock:
+            lats, lons, types = self.lamp_lats, self.lamp_lons, self.lamp_types
+        return [self._lamp_dict(lats, lons, types, i) for i in range(len(lats))]
+
+    @staticmethod
+    def _lamp_dict(lats, lons, types, idx):
+        return {'lat': float(lats[idx]), 'lon': float(lons[idx]), 'type': LAMP_TYPES[types[idx]]}
+    
+    def load_street_lamps_for_area(self, lat_min, lat_max, lon_min, lon_max, is_current=None):
+        """Belirtilen alan için sokak lambası verilerini çek (önbellekteki karolar yeniden indirilmez)
+
+        is_current verilirse ve False döndürürse (eski arama) yüklenen veri uygulanmaz.
+        """
+        keys = self.tile_cache.tiles_for_bbox(lat_min, lat_max, lon_min, lon_max)
+        cached = self.tile_cache.get_tiles(keys)
+        missing = [key for key in keys if key not in cached]
+        tiles = {key: lamps for key, (_, lamps) in cached.items()}
+        fetched_times = {key: fetched_at for key, (fetched_at, _) in cached.items()}
+        print(f"Lamba karoları: {len(cached)} önbellekten, {len(missing)} indirilecek")
+
+        if missing:
+            fetched = self.fetch_tiles(missing)
+            if fetched is None:
+                if not tiles:
+                    return False
+                print("Eksik karolar indirilemedi, önbellekteki veriler kullanılacak")
+            else:
+                now = time.time()
+                self.tile_cache.put_tiles(fetched, fetched_at=now)
+                tiles.update(fetched)
+                fetched_times.update((key, now) for key in fetched)
+
+        parts = [tiles[key] for key in keys if key in tiles] or [empty_lamps()]
+        lats = np.concatenate([p[0] for p in parts])
+        lons = np.concatenate([p[1] for p in parts])
+        types = np.concatenate([p[2] for p in parts])
+        # Yarıçap sorguları için ızgara indeksini bir kez kur
+        lamp_index = LampGridIndex(lats, lons)
+        order = np.argsort(lats, kind="stable")
+        data_version = hash(tuple(sorted(fetched_times.items())))
+
+        with self.lock:
+            if is_current is not None and not is_current():
+                print("Eski aramaya ait lamba verisi atlandı")
+                return False
+            self.lamp_lats, self.lamp_lons, self.lamp_types = lats, lons, types
+            self.lamp_index = lamp_index
+            self.sorted_lats = lats[order]
+            self.sorted_lons = lons[order]
+            self.data_version = data_version
+            self.loaded = True
+        print(f"Yüklenen sokak lambası sayısı: {len(lats)}")
+        return True
+
+    def fetch_tiles(self, keys):
+        """Eksik karoları kapsayan alanı Overpass'tan indir ve lambaları karolara dağıt"""
+        bounds = [self.tile_cache.tile_bounds(key) for key in keys]
+        lat_min = min(b[0] for b in bounds)
+        lat_max = max(b[1] for b in bounds)
+        lon_min = min(b[2] for b in bounds)
+        lon_max = max(b[3] for b in bounds)
+
+        lamps = self.query_overpass(lat_min, lat_max, lon_min, lon_max)
+        if lamps is None:
+            return None
+
+        # Boş karolar da kaydedilir ki tekrar sorgulanmasınlar
+        lats, lons, types = lamps
+        tile_size = self.tile_cache.tile_size
+        ti = np.floor(lats / tile_size).astype(np.int64)
+        tj = np.floor(lons / tile_size).astype(np.int64)
+        tiles = {}
+        for i, j in keys:
+            mask = (ti == i) & (tj == j)
+            tiles[(i, j)] = (lats[mask], lons[mask], types[mask])
+        return tiles
+
+    def query_overpass(self, lat_min, lat_max, lon_min, lon_max):
+        """Overpass API'den alan içindeki lambaları getir, hata durumunda None döndür"""
+        overpass_query = f"""
+        [out:json][timeout:25];
+        (
+          node["highway"="street_lamp"]({lat_min},{lon_min},{lat_max},{lon_max});
+          node["amenity"="lighting"]({lat_min},{lon_min},{lat_max},{lon_max});
+          way["lit"="yes"]["highway"]({lat_min},{lon_min},{lat_max},{lon_max});
+        );
+        out geom;
+        """
+        
+        try:
+            response = requests.post(self.overpass_url, data=overpass_query, timeout=30)
+            if response.status_code == 200:
+                data = response.json()
+                # Zaman aşımı/bellek hatasında da 200 döner; eksik sonuç önbelleğe yazılmamalı
+                remark = data.get('remark') or ''
+                if 'runtime error' in remark:
+                    print(f"Overpass API eksik yanıt döndürdü: {remark}")
+                    return None
+                lats, lons, types = [], [], []
+                way_code = lamp_type_code('way_lighting')
+                
+                for element in data.get('elements', []):
+                    if element['type'] == 'node':
+                        lats.append(element['lat'])
+                        lons.append(element['lon'])
+                        types.append(lamp_type_code(element.get('tags', {}).get('highway', 'lighting')))
+                    elif element['type'] == 'way' and 'geometry' in element:
+                        # Aydınlatmalı yolların geometrisini ekle
+                        for coord in element['geometry']:
+                            lats.append(coord['lat'])
+                            lons.append(coord['lon'])
+                            types.append(way_code)
+                
+                return (np.array(lats, dtype=float),
+                        np.array(lons, dtype=float),
+                        np.array(types, dtype=np.uint8))
+            else:
+                print(f"Overpass API hatası: {response.status_code}")
+                return None
+        except Exception as e:
+            print(f"Sokak lambası veri çekme hatası: {e}")
+            return None
+    
+    def get_lamps_near_point(self, lat, lon, radius=0.001):
+        """Belirtilen noktaya yakın sokak lambalarını getir"""
+        with self.lock:
+            lats, lons, types = self.lamp_lats, self.lamp_lons, self.lamp_types
+            lamp_index = self.lamp_index
+        nearby_lamps = []
+        # Sadece yakındaki hücrelerdeki lambaları kontrol et
+        for idx in lamp_index.candidates(lat, lon, radius):
+            distance = self.haversine_distance(lat, lon, float(lats[idx]), float(lons[idx]))
+            if distance <= radius:
+                nearby_lamps.append(self._lamp_dict(lats, lons, types, idx))
+        return nearby_lamps
+    
+    def count_lamps_near_points(self, lats, lons, radius=0.001, chunk_size=256, max_pairs=1_000_000):
+        """Her nokta için yarıçap (km) içindeki lamba sayısını vektörel olarak hesapla"""
+        with self.lock:
+            sorted_lats, sorted_lons = self.sorted_lats, self.sorted_lons
+        return count_near_points(sorted_lats, sorted_lons, lats, lons, radius, chunk_size, max_pairs)
+
+    haversine_distance = staticmethod(haversine_distance)
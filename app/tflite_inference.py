@@ -1,52 +1,138 @@
-from jnius import autoclass, cast
+import os
+import sys
+import time
 import numpy as np
 
-# Android asset erişimi için gerekli sınıflar
-PythonActivity = autoclass('org.kivy.android.PythonActivity')
-activity = PythonActivity.mActivity
-AssetManager = activity.getAssets()
+# Android'de TFLite Java API'si, masaüstünde LiteRT/tflite_runtime ya da TensorFlow kullanılır
+try:
+    from jnius import autoclass
+except ImportError:
+    autoclass = None
 
-# TensorFlow Lite ile çalışma
-Interpreter = autoclass('org.tensorflow.lite.Interpreter')
-ByteBuffer = autoclass('java.nio.ByteBuffer')
-ByteOrder = autoclass('java.nio.ByteOrder')
-FileInputStream = autoclass('java.io.FileInputStream')
-FileChannel = autoclass('java.nio.channels.FileChannel')
+# Giriş: 64x64 gri görüntü, çıkış: 7 duygu olasılığı
+INPUT_SHAPE = (1, 64, 64, 1)
+NUM_CLASSES = 7
 
-def load_tflite_model():
+# Masaüstünde varsayılan model (convert_to_tflite.py çıktısı)
+DESKTOP_MODEL_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'emotion_model.tflite'
+)
+
+
+class AndroidTFLiteBackend:
+    """org.tensorflow.lite.Interpreter üzerinde çalışır; tamponlar grup boyutu değişmedikçe yeniden kullanılır.
+
+    Giriş tek bir put(byte[]) çağrısıyla doldurulur, çıkış da heap tamponunun
+    array() dizisinden tek seferde okunur.
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.batch_size = None
+        self._allocate(INPUT_SHAPE[0])
+
+    def _allocate(self, batch_size):
+        ByteBuffer = autoclass('java.nio.ByteBuffer')
+        ByteOrder = autoclass('java.nio.ByteOrder')
+        if self.batch_size is not None:
+            # Yorumlayıcının giriş boyutu yeni grup boyutuna göre ayarlanır
+            self.interpreter.resizeInput(0, [batch_size, *INPUT_SHAPE[1:]])
+            self.interpreter.allocateTensors()
+        self.batch_size = batch_size
+        self.input_buffer = ByteBuffer.allocateDirect(batch_size * int(np.prod(INPUT_SHAPE[1:])) * 4)
+        self.input_buffer.order(ByteOrder.nativeOrder())
+        # Heap tamponu: array() ile tüm çıktı tek JNI çağrısında alınır
+        self.output_buffer = ByteBuffer.allocate(batch_size * NUM_CLASSES * 4)
+        self.output_buffer.order(ByteOrder.nativeOrder())
+
+    def run(self, input_array):
+        if len(input_array) != self.batch_size:
+            self._allocate(len(input_array))
+        self.input_buffer.rewind()
+        self.input_buffer.put(input_array.tobytes())
+        self.input_buffer.rewind()
+        self.output_buffer.rewind()
+        self.interpreter.run(self.input_buffer, self.output_buffer)
+        raw = bytes(self.output_buffer.array())
+        return np.frombuffer(raw, dtype=np.float32).reshape(self.batch_size, NUM_CLASSES)
+
+
+class DesktopTFLiteBackend:
+    """LiteRT, tflite_runtime ya da tf.lite yorumlayıcısı (test ve kıyaslama için)"""
+
+    def __init__(self, model_path=DESKTOP_MODEL_PATH):
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            try:
+                from tflite_runtime.interpreter import Interpreter
+            except ImportError:
+                from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=model_path)
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.batch_size = INPUT_SHAPE[0]
+
+    def run(self, input_array):
+        if len(input_array) != self.batch_size:
+            # Grup boyutu değişince tensörler bir kez yeniden ayrılır
+            self.interpreter.resize_tensor_input(self.input_index, [len(input_array), *INPUT_SHAPE[1:]])
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(input_array)
+        self.interpreter.set_tensor(self.input_index, input_array)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index)
+
+
+def load_tflite_model(model_path=None):
+    """Platforma uygun yorumlayıcıyı yükleyip arka ucu döndür, hata olursa None"""
     try:
+        if autoclass is None:
+            return DesktopTFLiteBackend(model_path or DESKTOP_MODEL_PATH)
+
+        # Android asset erişimi için gerekli sınıflar
+        PythonActivity = autoclass('org.kivy.android.PythonActivity')
+        Interpreter = autoclass('org.tensorflow.lite.Interpreter')
+        FileInputStream = autoclass('java.io.FileInputStream')
+        FileChannel = autoclass('java.nio.channels.FileChannel')
+
+        activity = PythonActivity.mActivity
         fd = activity.getAssets().openFd("emotion_model.tflite")
         input_stream = FileInputStream(fd.getFileDescriptor())
         file_channel = input_stream.getChannel()
         start_offset = fd.getStartOffset()
         declared_length = fd.getDeclaredLength()
         model_buffer = file_channel.map(FileChannel.MapMode.READ_ONLY, start_offset, declared_length)
-        interpreter = Interpreter(model_buffer)
-        return interpreter
+        return AndroidTFLiteBackend(Interpreter(model_buffer))
     except Exception as e:
         print(f"❌ Model yüklenemedi: {e}")
         return None
 
-def run_tflite_inference(interpreter, input_data):
-    try:
-        input_array = np.array(input_data, dtype=np.float32).reshape(1, 64, 64, 1)
-        input_buffer = ByteBuffer.allocateDirect(input_array.nbytes)
-        input_buffer.order(ByteOrder.nativeOrder())
-    
-        for val in input_array.flatten():
-            input_buffer.putFloat(val)
-
-        output_buffer = ByteBuffer.allocateDirect(7 * 4)  # 7 sınıf x float32
-        output_buffer.order(ByteOrder.nativeOrder())
-
-        interpreter.run(input_buffer, output_buffer)
-        output_buffer.rewind()
 
-        result = []
-        for _ in range(7):
-            result.append(output_buffer.getFloat())
-
-        return result
+def run_tflite_inference(backend, input_data):
+    """64x64 gri girişi çalıştırıp 7 sınıf olasılığını liste olarak döndür"""
+    try:
+        input_array = np.ascontiguousarray(input_data, dtype=np.float32).reshape(INPUT_SHAPE)
+        return backend.run(input_array)[0].tolist()
     except Exception as e:
         print(f"❌ İnferans başarısız: {e}")
         return []
+
+
+if __name__ == "__main__":
+    # Masaüstü kıyaslaması: python tflite_inference.py [model.tflite] [tekrar]
+    model_path = sys.argv[1] if len(sys.argv) > 1 else DESKTOP_MODEL_PATH
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    backend = load_tflite_model(model_path)
+    if backend is None:
+        sys.exit(1)
+
+    sample = np.random.default_rng(0).random(INPUT_SHAPE, dtype=np.float32)
+    run_tflite_inference(backend, sample)  # ısınma
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = run_tflite_inference(backend, sample)
+    elapsed = time.perf_counter() - start
+    print(f"{type(backend).__name__}: {repeats} çağrı, ortalama {elapsed / repeats * 1000:.3f} ms")
+    print(f"Örnek çıktı: {[round(p, 3) for p in result]}")
@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
+from emotion_analyzer import load_models, face_batch, predict_batch
+
+# Kullanım: python benchmark_faces.py [keras|tflite] [tekrar]
+backend_name = sys.argv[1] if len(sys.argv) > 1 else "keras"
+repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+if backend_name == "tflite":
+    from tflite_inference import load_tflite_model
+    model = load_tflite_model()
+else:
+    _, model = load_models()
+if model is None:
+    print("❌ Model yüklenemedi")
+    sys.exit(1)
+
+
+def single_face_path(gray, faces):
+    """Eski yol: her yüz için ayrı kırpma ve tek elemanlı tahmin"""
+    for face in faces:
+        batch = face_batch(gray, [face])
+        if hasattr(model, "run"):
+            model.run(batch)
+        else:
+            model.predict(batch, verbose=0)
+
+
+def batched_path(gray, faces):
+    predict_batch(model, face_batch(gray, faces))
+
+
+# Yüz içeriği çıkarım süresini etkilemez; sentetik kare ve kutular kullanılır
+rng = np.random.default_rng(0)
+gray = rng.integers(0, 256, (480, 640), dtype=np.uint8)
+
+print(f"Arka uç: {backend_name}, {repeats} tekrar")
+for count in (1, 2, 4, 8):
+    faces = [(int(rng.integers(0, 500)), int(rng.integers(0, 340)), 120, 120) for _ in range(count)]
+    for name, path in (("tek tek", single_face_path), ("grup", batched_path)):
+        path(gray, faces)  # ısınma
+        start = time.perf_counter()
+        for _ in range(repeats):
+            path(gray, faces)
+        per_face = (time.perf_counter() - start) / repeats / count * 1000
+        print(f"{count} yüz, {name:7s}: yüz başına {per_face:.3f} ms")
@@ -48,7 +48,7 @@ version = 0.1
 
 # (list) Application requirements
 # comma separated e.g. requirements = sqlite3,kivy
-requirements = python3,kivy,kivymd,plyer,requests,pillow
+requirements = python3,kivy,kivymd,plyer,requests,pillow,numpy
 
 # Sets custom source for any requirements with recipes
 # requirements.source.kivy = ../../kivy
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
+from emotion_analyzer import CASCADE_PATH
+from face_detector import FaceDetector, DNN_CONFIG_PATH, DNN_MODEL_PATH
+
+# Kullanım: python compare_detectors.py [görüntü_klasörü]
+# Klasör verilmezse benchmark_data/faces içindeki örnek set kullanılır. Klasördeki
+# görüntüler ad sırasıyla ardışık kareler gibi işlenir.
+#
+# Not: Doğruluk elle işaretlenmiş gerçek kutulara göre DEĞİL, tam çözünürlükte Haar
+# algılamasına (eski yöntem) göre IoU >= 0.5 eşleşmesiyle ölçülür. Duyarlılık 1.00,
+# yeni yöntemin eskisiyle aynı yüzleri bulduğunu gösterir; Haar'ın kaçırdığı ya da
+# yanlış bulduğu yüzler ölçüme yansımaz.
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+DEFAULT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_data", "faces")
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def matches(found, reference):
+    """Referans kutulardan IoU >= 0.5 ile eşleşenlerin sayısı"""
+    return sum(1 for ref in reference if any(iou(ref, box) >= 0.5 for box in found))
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FOLDER
+    paths = sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                   if name.lower().endswith(IMAGE_EXTS))
+    images = [img for img in (cv2.imread(path, cv2.IMREAD_GRAYSCALE) for path in paths) if img is not None]
+    if not images:
+        print("❌ Görüntü bulunamadı")
+        sys.exit(1)
+
+    cascade = cv2.CascadeClassifier(CASCADE_PATH)
+    variants = [
+        ("haar tam çözünürlük", FaceDetector(cascade, max_side=10 ** 6), False),
+        ("haar küçültülmüş", FaceDetector(cascade), False),
+        ("haar küçültülmüş + takip", FaceDetector(cascade), True),
+    ]
+    if os.path.exists(DNN_CONFIG_PATH) and os.path.exists(DNN_MODEL_PATH):
+        variants.append(("dnn küçültülmüş", FaceDetector(cascade, backend="dnn"), False))
+    else:
+        print(f"ℹ️ DNN modeli bulunamadı ({DNN_MODEL_PATH}), atlanıyor")
+
+    reference = None
+    print(f"{len(images)} görüntü")
+    for name, detector, track in variants:
+        detector.reset()
+        results = []
+        start = time.perf_counter()
+        for img in images:
+            results.append(detector.detect(img, track=track))
+        elapsed = (time.perf_counter() - start) / len(images) * 1000
+        if reference is None:
+            reference = results
+
+        total_ref = sum(len(r) for r in reference)
+        total_found = sum(len(r) for r in results)
+        matched = sum(matches(found, ref) for found, ref in zip(results, reference))
+        recall = matched / total_ref if total_ref else 1.0
+        precision = matched / total_found if total_found else 1.0
+        print(f"{name:26s} {elapsed:8.2f} ms/kare  yüz: {total_found:4d}  "
+              f"duyarlılık: {recall:.2f}  kesinlik: {precision:.2f}")
+
+
+if __name__ == "__main__":
+    main()
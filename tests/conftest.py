@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Uygulama modülleri app/ altında düz olarak içe aktarılır (from database import ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+import camera_stream
+from camera_stream import HazardStream
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 50, (64, 48))
+    for i in range(20):
+        writer.write(np.full((48, 64, 3), i * 10, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_analysis_errors_do_not_stop_the_stream(video):
+    calls = []
+
+    def analyze(frame):
+        calls.append(frame)
+        if len(calls) % 2:
+            raise ValueError("bozuk kare")
+        return 80
+
+    results = []
+    stream = HazardStream(video, rate=1000, window=1, sustain=1, analyze=analyze,
+                          on_result=lambda hazard, smoothed: results.append(hazard))
+    assert stream.start()
+    stream.wait()
+    assert len(calls) >= 2
+    assert results == [80] * (len(calls) // 2)
+
+
+def test_stream_does_not_open_camera_without_models(video, monkeypatch):
+    monkeypatch.setattr(camera_stream, "load_models", lambda: (None, None))
+    opened = []
+    monkeypatch.setattr(camera_stream.cv2, "VideoCapture", lambda source: opened.append(source))
+    stream = HazardStream(video)
+    assert not stream.start()
+    assert opened == []
+    assert stream._threads == []
@@ -0,0 +1,33 @@
+import glob
+import os
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from emotion_analyzer import CASCADE_PATH
+from face_detector import FaceDetector
+
+CLIP = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     "benchmark_data", "faces", "clip_*.jpg")))
+
+
+def iou(a, b):
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    return inter / (a[2] * a[3] + b[2] * b[3] - inter)
+
+
+@pytest.mark.parametrize("track", [False, True])
+def test_downscaled_detection_matches_full_resolution_on_clip(track):
+    cascade = cv2.CascadeClassifier(CASCADE_PATH)
+    full = FaceDetector(cascade, max_side=10 ** 6)
+    small = FaceDetector(cascade)
+    assert len(CLIP) == 24
+    for path in CLIP:
+        frame = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        reference = full.detect(frame)
+        found = small.detect(frame, track=track)
+        assert len(reference) == len(found) == 1
+        assert iou(reference[0], found[0]) >= 0.5
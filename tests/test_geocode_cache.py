@@ -0,0 +1,52 @@
+import itertools
+
+import pytest
+
+import geocode_cache
+from database import close_connection
+from geocode_cache import GeocodeCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # last_used sırası belirli olsun diye saat her çağrıda bir saniye ilerler
+    clock = itertools.count(1_700_000_000)
+    monkeypatch.setattr(geocode_cache.time, "time", lambda: float(next(clock)))
+    path = str(tmp_path / "users.db")
+    yield GeocodeCache(path, max_entries=3)
+    close_connection(path)
+
+
+def test_normalize():
+    assert GeocodeCache.normalize("  Atatürk Cad.,  LEFKOŞA. ") == "atatürk cad. lefkoşa"
+    assert GeocodeCache.normalize("Dereboyu,Lefkoşa") == "dereboyu lefkoşa"
+    assert GeocodeCache.normalize(" ,.; ") == ""
+
+
+def test_hit_after_normalisation(cache):
+    cache.put("Dereboyu Caddesi, Lefkoşa", 35.19, 33.36, "Dereboyu")
+    assert cache.get("  dereboyu   caddesi lefkoşa. ") == (35.19, 33.36, "Dereboyu")
+    assert cache.stats()["hits"] == 1
+
+
+def test_prefix_hit_returns_most_recently_used(cache):
+    cache.put("Girne Kapısı, Lefkoşa", 35.18, 33.36, "Kapı")
+    cache.put("Girne Limanı", 35.34, 33.32, "Liman")
+    assert cache.get("girne") == (35.34, 33.32, "Liman")
+    # Kullanım last_used'ı tazeler, önek araması son kullanılanı seçer
+    cache.get("Girne Kapısı Lefkoşa")
+    assert cache.get("Girne") == (35.18, 33.36, "Kapı")
+    # Kısa anahtar önek aramasına girmez
+    assert cache.get("gir") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["prefix_hits"], stats["misses"]) == (1, 2, 1)
+
+
+def test_least_recently_used_entry_is_evicted_at_capacity(cache):
+    for name in ("alsancak", "bellapais", "catalköy"):
+        cache.put(name, 35.0, 33.0)
+    cache.get("alsancak")
+    cache.put("dikmen", 35.1, 33.1)
+    assert cache.get("bellapais") is None
+    for name in ("alsancak", "catalköy", "dikmen"):
+        assert cache.get(name) is not None
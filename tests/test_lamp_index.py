@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from lamp_index import LampGridIndex, count_near_points, degree_window, haversine_distance
+
+
+def brute_force_counts(lamp_lats, lamp_lons, lats, lons, radius):
+    return np.array([
+        sum(haversine_distance(lat, lon, lamp_lat, lamp_lon) <= radius
+            for lamp_lat, lamp_lon in zip(lamp_lats, lamp_lons))
+        for lat, lon in zip(lats, lons)
+    ])
+
+
+def random_lamps(rng, center, spread, n):
+    return center[0] + rng.uniform(-spread, spread, n), center[1] + rng.uniform(-spread, spread, n)
+
+
+@pytest.mark.parametrize("center", [(41.01, 28.97), (-33.87, 151.21), (69.65, 18.96), (0.0, 179.99)])
+@pytest.mark.parametrize("radius", [0.05, 0.3])
+def test_grid_and_vectorised_counts_match_brute_force(center, radius):
+    rng = np.random.default_rng(42)
+    lamp_lats, lamp_lons = random_lamps(rng, center, 0.02, 400)
+    lats, lons = random_lamps(rng, center, 0.02, 60)
+    expected = brute_force_counts(lamp_lats, lamp_lons, lats, lons, radius)
+
+    index = LampGridIndex(lamp_lats, lamp_lons)
+    grid_counts = np.array([
+        sum(haversine_distance(lat, lon, lamp_lats[i], lamp_lons[i]) <= radius
+            for i in index.candidates(lat, lon, radius))
+        for lat, lon in zip(lats, lons)
+    ])
+
+    order = np.argsort(lamp_lats, kind="stable")
+    vector_counts = count_near_points(lamp_lats[order], lamp_lons[order], lats, lons, radius)
+
+    np.testing.assert_array_equal(grid_counts, expected)
+    np.testing.assert_array_equal(vector_counts, expected)
+    # Sayımlar anlamlı olsun: bazı noktaların yakınında lamba olmalı
+    assert expected.sum() > 0
+
+
+def test_vectorised_counts_split_chunks_when_pairs_exceed_limit():
+    rng = np.random.default_rng(7)
+    lamp_lats, lamp_lons = random_lamps(rng, (41.0, 29.0), 0.01, 300)
+    lats, lons = random_lamps(rng, (41.0, 29.0), 0.01, 50)
+    order = np.argsort(lamp_lats, kind="stable")
+    sorted_lats, sorted_lons = lamp_lats[order], lamp_lons[order]
+
+    whole = count_near_points(sorted_lats, sorted_lons, lats, lons, 0.2)
+    split = count_near_points(sorted_lats, sorted_lons, lats, lons, 0.2, chunk_size=16, max_pairs=100)
+    np.testing.assert_array_equal(split, whole)
+    np.testing.assert_array_equal(whole, brute_force_counts(lamp_lats, lamp_lons, lats, lons, 0.2))
+
+
+def test_candidates_cover_every_lamp_within_radius():
+    rng = np.random.default_rng(3)
+    lamp_lats, lamp_lons = random_lamps(rng, (60.0, 10.0), 0.05, 500)
+    index = LampGridIndex(lamp_lats, lamp_lons)
+    for lat, lon in zip(*random_lamps(rng, (60.0, 10.0), 0.05, 20)):
+        candidates = set(index.candidates(lat, lon, 0.5).tolist())
+        for i, (lamp_lat, lamp_lon) in enumerate(zip(lamp_lats, lamp_lons)):
+            if haversine_distance(lat, lon, lamp_lat, lamp_lon) <= 0.5:
+                assert i in candidates
+
+
+def test_empty_inputs():
+    index = LampGridIndex(np.empty(0), np.empty(0))
+    assert len(index.candidates(41.0, 29.0, 1.0)) == 0
+    counts = count_near_points(np.empty(0), np.empty(0), [41.0, 41.1], [29.0, 29.1])
+    np.testing.assert_array_equal(counts, [0, 0])
+
+
+def test_degree_window_near_pole_spans_all_longitudes():
+    assert degree_window(89.999, 1.0)[1] == 180.0
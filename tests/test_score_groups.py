@@ -0,0 +1,152 @@
+import random
+
+import pytest
+
+from database import Database, group_factor, group_key, location_cell, close_connection
+
+BBOX = (35.0, 35.4, 33.0, 33.6)
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "users.db")
+    database = Database(path)
+    yield database
+    close_connection(path)
+
+
+def random_scores(rng, n):
+    return [(1, rng.uniform(35.05, 35.35), rng.uniform(33.05, 33.55), rng.randint(1, 5)) for _ in range(n)]
+
+
+def by_group(rows, factor):
+    return {group_key(*location_cell(row[0], row[1]), factor): row for row in rows}
+
+
+@pytest.mark.parametrize("zoom", [10, 14, 18])
+def test_patching_changed_groups_matches_full_reload(db, zoom):
+    rng = random.Random(zoom)
+    db.save_scores(random_scores(rng, 2000))
+    factor = group_factor(zoom)
+    loaded = by_group(db.get_scores_in_bbox(*BBOX, zoom), factor)
+    high_water = db.get_max_score_id()
+
+    # Mevcut bir konuma ve yeni konumlara puan ekle
+    lat, lon = next(iter(loaded.values()))[:2]
+    db.save_scores(random_scores(rng, 30) + [(2, lat, lon, 1)])
+    cells, high_water = db.get_changed_cells(high_water, *BBOX)
+    assert high_water == db.get_max_score_id()
+    assert location_cell(lat, lon) in cells
+
+    groups = {group_key(*cell, factor) for cell in cells}
+    loaded.update(db.get_score_groups(groups, zoom))
+
+    expected = by_group(db.get_scores_in_bbox(*BBOX, zoom), factor)
+    assert loaded.keys() == expected.keys()
+    for key, row in expected.items():
+        assert loaded[key] == pytest.approx(row)
+
+
+def test_no_new_rows_returns_no_cells(db):
+    db.save_scores([(1, 35.1, 33.3, 4)])
+    high_water = db.get_max_score_id()
+    assert db.get_changed_cells(high_water, *BBOX) == (set(), high_water)
+
+
+def test_changed_cells_are_limited_to_bbox_and_capped(db):
+    high_water = db.get_max_score_id()
+    db.save_scores([(1, 35.1, 33.3, 4), (1, 36.5, 33.3, 2)])
+    cells, max_id = db.get_changed_cells(high_water, *BBOX)
+    assert cells == {location_cell(35.1, 33.3)}
+    assert max_id == db.get_max_score_id()
+
+    # Sınırı aşan değişiklikte hücreler yerine None döner
+    db.save_scores(random_scores(random.Random(1), 50))
+    cells, _ = db.get_changed_cells(max_id, *BBOX, limit=10)
+    assert cells is None
+    cells, _ = db.get_changed_cells(max_id, *BBOX, max_rows=20)
+    assert cells is None
+
+
+def make_db(tmp_path, name):
+    path = str(tmp_path / name)
+    return Database(path), path
+
+
+def spread_timestamps(db):
+    # save_scores tüm satırlara aynı saniyeyi yazar; ayrı zamanlar dışa aktarımı belirgin kılar
+    with db.conn:
+        db.conn.execute("UPDATE security_scores SET created_at = datetime(1700000000 + id * 60, 'unixepoch')")
+
+
+def test_export_import_round_trip_matches_source(db, tmp_path):
+    rng = random.Random(18)
+    db.save_scores(random_scores(rng, 1500) + [(2, 35.2, 33.2, 5), (3, 35.2, 33.2, 1)])
+    spread_timestamps(db)
+    path = str(tmp_path / "scores.npz")
+    assert db.export_scores(path) == 1502
+
+    target, target_path = make_db(tmp_path, "target.db")
+    try:
+        assert target.import_scores(path) == 1502
+        for zoom in (10, 14, 18):
+            imported = sorted(target.get_scores_in_bbox(*BBOX, zoom))
+            source = sorted(db.get_scores_in_bbox(*BBOX, zoom))
+            assert len(imported) == len(source)
+            for row, expected in zip(imported, source):
+                assert row == pytest.approx(expected)
+        for lat, lon, *_ in db.get_scores_in_bbox(*BBOX, 18):
+            assert target.get_location_aggregate(lat, lon) == db.get_location_aggregate(lat, lon)
+        assert target.get_location_aggregate(35.2, 33.2) == (2, 6, 1, 5)
+
+        # Aynı dosya ikinci kez eklenmez; özet tablo ve R*Tree ham puanlarla tutarlı kalır
+        assert target.import_scores(path) == 0
+        assert target.rebuild_aggregates() == 0
+    finally:
+        close_connection(target_path)
+
+
+def test_import_merges_into_existing_cells(db, tmp_path):
+    db.save_scores([(1, 35.1, 33.3, 2), (1, 35.3, 33.5, 4)])
+    spread_timestamps(db)
+    path = str(tmp_path / "scores.npz")
+    db.export_scores(path)
+
+    target, target_path = make_db(tmp_path, "target.db")
+    try:
+        target.save_scores([(5, 35.1, 33.3, 5)])
+        assert target.import_scores(path) == 2
+        assert target.get_location_aggregate(35.1, 33.3) == (2, 7, 2, 5)
+        assert target.get_location_aggregate(35.3, 33.5) == (1, 4, 4, 4)
+        assert len(target.get_scores_in_bbox(*BBOX, 18)) == 2
+        assert target.rebuild_aggregates() == 0
+    finally:
+        close_connection(target_path)
+
+
+def test_review_pages_have_no_duplicates_or_gaps_with_equal_timestamps(db):
+    from session_manager import SessionManager
+    sessions = SessionManager(db.db_path)
+    user_ids = [sessions.create_user(f"{i:011d}", "pw", 1990, f"555{i:07d}") for i in range(3)]
+    db.save_scores([(user_ids[i % 3], 35.1, 33.3, i % 5 + 1) for i in range(23)]
+                   + [(user_ids[0], 35.2, 33.2, 3)])
+    # Üçer satır aynı created_at değerini paylaşır
+    with db.conn:
+        db.conn.execute("UPDATE security_scores SET created_at = datetime(1700000000 + (id / 3) * 60, 'unixepoch')")
+
+    seen, before = [], None
+    while True:
+        page = db.get_location_reviews(35.1, 33.3, limit=4, before=before)
+        if not page:
+            break
+        assert len(page) <= 4
+        seen.extend(page)
+        before = (page[-1][2], page[-1][3])
+
+    ids = [row[3] for row in seen]
+    assert len(ids) == len(set(ids)) == 23
+    # Tam liste en yeniden eskiye (tarih, id) sırasında
+    assert [(row[2], row[3]) for row in seen] == sorted(((row[2], row[3]) for row in seen), reverse=True)
+    expected = db.conn.execute(
+        "SELECT id FROM security_scores WHERE cell_lat = ? AND cell_lon = ?", location_cell(35.1, 33.3)).fetchall()
+    assert set(ids) == {row[0] for row in expected}
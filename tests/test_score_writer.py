@@ -0,0 +1,52 @@
+import pytest
+
+from database import Database, close_connection, location_cell
+from score_writer import ScoreWriteQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    path = str(tmp_path / "users.db")
+    # Arka plan yazıcısı kendiliğinden yazmasın, testler flush'ı elle çağırır
+    writer = ScoreWriteQueue(Database(path), flush_interval=3600, max_batch=10_000)
+    yield writer
+    writer.close()
+    close_connection(path)
+
+
+def test_flushed_cells_are_evicted_and_read_from_database(queue):
+    queue.add(1, 35.1, 33.3, 5)
+    center, details = queue.add(2, 35.1, 33.3, 1)
+    assert details == (2, 3.0, 1, 5)
+    assert queue.cached_details(*center) == details
+
+    assert queue.flush() == 2
+    assert queue.cached_details(*center) is None
+    assert queue.pending_aggregates() == {}
+    assert queue.db.get_location_details(*center) == (2, 3.0, 1, 5)
+
+    # Bellekten atılan hücreye yeni puan veritabanındaki özetin üstüne eklenir
+    _, details = queue.add(3, 35.1, 33.3, 3)
+    assert details == (3, 3.0, 1, 5)
+    assert queue.flush() == 1
+    assert queue.db.get_location_details(*center) == (3, 3.0, 1, 5)
+
+
+def test_cells_with_unflushed_rows_stay_cached(queue):
+    queue.add(1, 35.1, 33.3, 4)
+    queue.flush()
+    queue.add(1, 35.2, 33.4, 2)
+    assert set(queue._aggregates) == {location_cell(35.2, 33.4)}
+
+
+def test_failed_flush_keeps_cached_aggregates(queue, monkeypatch):
+    center, _ = queue.add(1, 35.1, 33.3, 4)
+
+    def fail(rows):
+        raise RuntimeError("disk full")
+    monkeypatch.setattr(queue.db, "save_scores", fail)
+    assert queue.flush() is None
+    assert queue.cached_details(*center) == (1, 4.0, 4, 4)
+    monkeypatch.undo()
+    assert queue.flush() == 1
+    assert queue.cached_details(*center) is None
@@ -0,0 +1,150 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from lamp_cache import LampTileCache
+from street_lamps import StreetLampManager
+
+# Karo boyutu 0.02°: lambalar 41.00-41.08 / 29.00-29.08 aralığında 0.005° arayla dizilir
+CANNED_ELEMENTS = [
+    {"type": "node", "lat": 41.0025 + i * 0.005, "lon": 29.0025 + j * 0.005, "tags": {"highway": "street_lamp"}}
+    for i in range(16) for j in range(16)
+] + [
+    {"type": "way", "tags": {"lit": "yes", "highway": "residential"},
+     "geometry": [{"lat": 41.011, "lon": 29.011}, {"lat": 41.012, "lon": 29.012}]},
+]
+BBOX_RE = re.compile(r'\(([-\d.]+),([-\d.]+),([-\d.]+),([-\d.]+)\)')
+
+
+class OverpassStub:
+    def __init__(self):
+        self.queries = []
+        self.status = 200
+        self.remark = None
+
+    def bboxes(self):
+        """İstek başına sorgulanan (lat_min, lon_min, lat_max, lon_max)"""
+        return [tuple(float(v) for v in BBOX_RE.search(q).groups()) for q in self.queries]
+
+
+@pytest.fixture
+def overpass():
+    stub = OverpassStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+            stub.queries.append(body)
+            if stub.remark:
+                # Overpass zaman aşımında da 200 ile eksik (burada boş) sonuç döndürür
+                data = {"elements": [], "remark": stub.remark}
+            else:
+                data = {"elements": CANNED_ELEMENTS}
+            payload = json.dumps(data).encode()
+            self.send_response(stub.status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stub.url = f"http://127.0.0.1:{server.server_port}/api/interpreter"
+    yield stub
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "lamp_cache.db")
+
+
+def make_manager(overpass, cache_path, **cache_kwargs):
+    return StreetLampManager(overpass_url=overpass.url, tile_cache=LampTileCache(cache_path, **cache_kwargs))
+
+
+# 2x2 karo: (2050..2051, 1450..1451)
+BBOX = (41.001, 41.039, 29.001, 29.039)
+
+
+def test_cold_load_fetches_missing_tiles_in_one_request(overpass, cache_path):
+    manager = make_manager(overpass, cache_path)
+    assert manager.load_street_lamps_for_area(*BBOX)
+    assert len(overpass.queries) == 1
+    # Eksik karoların toplam alanı tek sorguda istenir
+    assert overpass.bboxes()[0] == pytest.approx((41.0, 29.0, 41.04, 29.04))
+    # 2x2 karodaki 8x8 düğüm + aydınlatmalı yolun iki noktası
+    assert len(manager.lamp_lats) == 64 + 2
+
+
+def test_warm_load_uses_cache_without_requests(overpass, cache_path):
+    make_manager(overpass, cache_path).load_street_lamps_for_area(*BBOX)
+    manager = make_manager(overpass, cache_path)
+    assert manager.load_street_lamps_for_area(*BBOX)
+    assert len(overpass.queries) == 1
+    assert len(manager.lamp_lats) == 66
+
+
+def test_partially_overlapping_bbox_fetches_only_new_tiles(overpass, cache_path):
+    manager = make_manager(overpass, cache_path)
+    manager.load_street_lamps_for_area(*BBOX)
+    # Bir karo sütunu doğuya kaydırılmış alan: yalnızca 1452. sütun eksik
+    assert manager.load_street_lamps_for_area(41.001, 41.039, 29.021, 29.059)
+    assert len(overpass.queries) == 2
+    assert overpass.bboxes()[1] == pytest.approx((41.0, 29.04, 41.04, 29.06))
+    # Aydınlatmalı yol alanın dışında kalan 1450. sütunda
+    assert len(manager.lamp_lats) == 64
+
+
+def test_expired_tiles_are_fetched_again_and_purged(overpass, cache_path):
+    cache = LampTileCache(cache_path, ttl=3600)
+    manager = StreetLampManager(overpass_url=overpass.url, tile_cache=cache)
+    manager.load_street_lamps_for_area(*BBOX)
+    later = time.time() + 7200
+
+    assert cache.get_tiles(cache.tiles_for_bbox(*BBOX), now=later) == {}
+    assert cache.purge_expired(now=later) == 4
+    assert manager.load_street_lamps_for_area(*BBOX)
+    assert len(overpass.queries) == 2
+
+
+def test_expired_ttl_triggers_refetch(overpass, cache_path):
+    make_manager(overpass, cache_path).load_street_lamps_for_area(*BBOX)
+    # Negatif TTL ile önbellekteki tüm karolar süresi dolmuş sayılır
+    manager = make_manager(overpass, cache_path, ttl=-1)
+    assert manager.load_street_lamps_for_area(*BBOX)
+    assert len(overpass.queries) == 2
+    assert len(manager.lamp_lats) == 66
+
+
+def test_failed_request_falls_back_to_cached_tiles(overpass, cache_path):
+    make_manager(overpass, cache_path).load_street_lamps_for_area(*BBOX)
+    overpass.status = 500
+    manager = make_manager(overpass, cache_path)
+    # Önbellekte olmayan sütun indirilemez, var olan karolar yine kullanılır
+    assert manager.load_street_lamps_for_area(41.001, 41.039, 29.021, 29.059)
+    assert len(overpass.queries) == 2
+    assert len(manager.lamp_lats) == 32
+
+
+def test_runtime_error_remark_is_not_cached(overpass, cache_path):
+    overpass.remark = 'runtime error: Query timed out in "query" at line 3 after 26 seconds.'
+    cache = LampTileCache(cache_path)
+    manager = StreetLampManager(overpass_url=overpass.url, tile_cache=cache)
+    assert not manager.load_street_lamps_for_area(*BBOX)
+    assert cache.get_tiles(cache.tiles_for_bbox(*BBOX)) == {}
+
+    # Sonraki denemede karolar yeniden istenir
+    overpass.remark = None
+    assert manager.load_street_lamps_for_area(*BBOX)
+    assert len(overpass.queries) == 2
+    assert len(manager.lamp_lats) == 66